@@ -0,0 +1,143 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import router
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from reviews.models import User
+
+SNAPSHOT_FIELDS = ('id', 'username', 'role', 'is_superuser', 'is_active')
+# Model.from_db ждет значения в порядке полей модели.
+SNAPSHOT_ATTNAMES = tuple(
+    field.attname for field in User._meta.concrete_fields
+    if field.attname in SNAPSHOT_FIELDS
+)
+ROLE_CLAIMS = ('username', 'role', 'is_superuser')
+USER_CHANGED_KEY = 'auth:user-changed:{}'
+
+
+class UserSnapshotCache:
+    """Снимки пользователей в памяти процесса: поля, нужные правам доступа.
+
+    Запись живет AUTH_USER_CACHE_TIMEOUT секунд и удаляется сигналами при
+    сохранении или удалении пользователя в этом процессе. Об изменениях в
+    других процессах сообщает время изменения пользователя в общем кеше:
+    снимок, прочитанный из базы раньше него, не используется. При
+    переполнении вытесняются самые старые записи.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = {}
+
+    def get(self, user_id):
+        with self.lock:
+            entry = self.entries.get(user_id)
+        if entry is None:
+            return None
+        expires_at, loaded_at, values = entry
+        changed_at = cache.get(USER_CHANGED_KEY.format(user_id))
+        if (expires_at < time.monotonic()
+                or (changed_at is not None and changed_at >= loaded_at)):
+            self.invalidate(user_id)
+            return None
+        return values
+
+    def set(self, user_id, user, loaded_at):
+        """Сохраняет снимок; loaded_at - время до чтения пользователя из
+        базы, чтобы изменение во время чтения сбросило снимок."""
+        values = tuple(getattr(user, field) for field in SNAPSHOT_ATTNAMES)
+        expires_at = time.monotonic() + settings.AUTH_USER_CACHE_TIMEOUT
+        with self.lock:
+            self.entries.pop(user_id, None)
+            while len(self.entries) >= settings.AUTH_USER_CACHE_MAX_ENTRIES:
+                del self.entries[next(iter(self.entries))]
+            self.entries[user_id] = (expires_at, loaded_at, values)
+
+    def invalidate(self, user_id):
+        with self.lock:
+            self.entries.pop(user_id, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+user_snapshots = UserSnapshotCache()
+
+
+def snapshot_user(values):
+    """Пользователь из снимка; остальные поля загрузятся при обращении."""
+    return User.from_db(router.db_for_read(User), SNAPSHOT_ATTNAMES, values)
+
+
+def access_token_for_user(user):
+    """Токен доступа; при AUTH_TOKEN_ROLE_CLAIMS - с ролью пользователя."""
+    token = AccessToken.for_user(user)
+    if settings.AUTH_TOKEN_ROLE_CLAIMS:
+        # Время выдачи с долями секунды сравнивается со временем
+        # изменения пользователя, сохраненным в кеше.
+        token['iat'] = time.time()
+        for claim in ROLE_CLAIMS:
+            token[claim] = getattr(user, claim)
+    return token
+
+
+def forget_user(user_id):
+    """Сбрасывает снимки пользователя во всех процессах и роль в выданных
+    ему токенах."""
+    user_snapshots.invalidate(user_id)
+    cache.set(
+        USER_CHANGED_KEY.format(user_id), time.time(),
+        timeout=max(settings.AUTH_TOKEN_CLAIMS_MAX_AGE,
+                    settings.AUTH_USER_CACHE_TIMEOUT)
+    )
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication, который берет пользователя из снимка в памяти.
+
+    Пока снимок действителен, аутентификация не обращается к базе данных.
+    В снимок попадают только активные пользователи. При
+    AUTH_TOKEN_ROLE_CLAIMS пользователь собирается из утверждений токена,
+    если токен выдан не раньше AUTH_TOKEN_CLAIMS_MAX_AGE секунд назад и
+    после последнего изменения пользователя.
+    """
+
+    def get_user(self, validated_token):
+        user = self.get_token_user(validated_token)
+        if user is not None:
+            return user
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        values = user_snapshots.get(user_id)
+        if values is not None:
+            return snapshot_user(values)
+        loaded_at = time.time()
+        user = super().get_user(validated_token)
+        user_snapshots.set(user_id, user, loaded_at)
+        return user
+
+    def get_token_user(self, validated_token):
+        """Пользователь из утверждений токена или None, если им нельзя
+        доверять и пользователя нужно прочитать из снимка или базы."""
+        if not settings.AUTH_TOKEN_ROLE_CLAIMS:
+            return None
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+            issued_at = validated_token['iat']
+            values = {claim: validated_token[claim] for claim in ROLE_CLAIMS}
+        except KeyError:
+            return None
+        if issued_at + settings.AUTH_TOKEN_CLAIMS_MAX_AGE < time.time():
+            return None
+        changed_at = cache.get(USER_CHANGED_KEY.format(user_id))
+        if changed_at is not None and issued_at <= changed_at:
+            return None
+        values.update(id=user_id, is_active=True)
+        return snapshot_user(
+            tuple(values[field] for field in SNAPSHOT_ATTNAMES)
+        )
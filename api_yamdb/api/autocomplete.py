@@ -0,0 +1,188 @@
+import bisect
+import threading
+
+from reviews.models import Category, Genre, Title
+from .cache import bump_version, get_versions
+
+AUTOCOMPLETE_MODELS = {
+    'titles': (Title, ('id', 'name')),
+    'genres': (Genre, ('id', 'name', 'slug')),
+    'categories': (Category, ('id', 'name', 'slug')),
+}
+
+
+def normalize(value):
+    return ' '.join(value.casefold().split())
+
+
+def prefix_keys(name):
+    """Ключи для поиска по началу названия и по началу каждого слова."""
+    words = normalize(name).split()
+    return {' '.join(words[idx:]) for idx in range(len(words))}
+
+
+class PrefixIndex:
+    """Отсортированный массив ключей с поиском по префиксу бинарным
+    поиском."""
+
+    def __init__(self):
+        self.keys = []
+        self.items = {}
+
+    def add(self, item):
+        self.remove(item['id'])
+        self.items[item['id']] = item
+        for key in prefix_keys(item['name']):
+            bisect.insort(self.keys, (key, item['id']))
+
+    def add_many(self, items):
+        """Добавляет пакет элементов одной сортировкой ключей.
+
+        Вставка каждого ключа через insort сдвигает массив и на большом
+        пакете дает квадратичное время; здесь старые ключи пакета
+        удаляются одним проходом, а новые дописываются и сортируются
+        вместе с уже упорядоченными.
+        """
+        items = {item['id']: item for item in items}
+        stale = items.keys() & self.items.keys()
+        if stale:
+            self.keys = [key for key in self.keys if key[1] not in stale]
+        self.items.update(items)
+        self.keys.extend(
+            (key, pk)
+            for pk, item in items.items()
+            for key in prefix_keys(item['name'])
+        )
+        self.keys.sort()
+
+    def remove(self, pk):
+        item = self.items.pop(pk, None)
+        if item is None:
+            return
+        for key in prefix_keys(item['name']):
+            idx = bisect.bisect_left(self.keys, (key, pk))
+            if idx < len(self.keys) and self.keys[idx] == (key, pk):
+                del self.keys[idx]
+
+    def search(self, prefix, limit):
+        result = []
+        seen = set()
+        idx = bisect.bisect_left(self.keys, (prefix,))
+        while idx < len(self.keys) and len(result) < limit:
+            key, pk = self.keys[idx]
+            if not key.startswith(prefix):
+                break
+            if pk not in seen:
+                seen.add(pk)
+                result.append(self.items[pk])
+            idx += 1
+        return result
+
+
+class AutocompleteIndex:
+    """Индекс названий произведений, жанров и категорий в памяти процесса.
+
+    Строится при первом обращении и обновляется сигналами при записи.
+    Записи из других процессов обнаруживаются по версиям моделей в кеше,
+    если кеш общий для процессов: при расхождении индекс перестраивается
+    целиком. Перестройка идет без блокировки поиска, который до ее
+    окончания отвечает по прежнему индексу.
+    """
+    models = tuple(model for model, _ in AUTOCOMPLETE_MODELS.values())
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.build_lock = threading.Lock()
+        self.indexes = None
+        self.versions = None
+
+    def build(self):
+        """Читает индексы из базы; версии берутся до чтения, чтобы запись
+        во время построения вызвала следующую перестройку."""
+        versions = get_versions(self.models)
+        indexes = {}
+        for kind, (model, fields) in AUTOCOMPLETE_MODELS.items():
+            index = PrefixIndex()
+            index.add_many(model.objects.order_by().values(*fields).iterator())
+            indexes[kind] = index
+        return indexes, versions
+
+    def get_indexes(self):
+        versions = get_versions(self.models)
+        with self.lock:
+            if self.indexes is not None and self.versions == versions:
+                return self.indexes
+            stale = self.indexes
+        if stale is None:
+            self.build_lock.acquire()
+        elif not self.build_lock.acquire(blocking=False):
+            # Индекс уже перестраивается другим потоком.
+            return stale
+        try:
+            with self.lock:
+                if (self.indexes is not None
+                        and self.versions == get_versions(self.models)):
+                    return self.indexes
+            indexes, versions = self.build()
+            with self.lock:
+                self.indexes = indexes
+                self.versions = versions
+            return indexes
+        finally:
+            self.build_lock.release()
+
+    def search(self, query, limit):
+        prefix = normalize(query)
+        indexes = self.get_indexes()
+        with self.lock:
+            return {
+                kind: index.search(prefix, limit) if prefix else []
+                for kind, index in indexes.items()
+            }
+
+    def update(self, instance, deleted=False):
+        self.update_many([instance], deleted=deleted)
+
+    def update_many(self, instances, deleted=False):
+        """Обновляет индекс и версии моделей записанных объектов.
+
+        Новые версии принимаются индексом, только если до записи его
+        версии совпадали с общими. Иначе индекс пропустил запись другого
+        процесса и перестроится при следующем поиске.
+        """
+        shared = get_versions(self.models)
+        bumped = {
+            model: bump_version(model)
+            for model in {type(instance) for instance in instances}
+        }
+        with self.lock:
+            if self.indexes is None:
+                return
+            for kind, (model, fields) in AUTOCOMPLETE_MODELS.items():
+                items = [
+                    instance for instance in instances
+                    if isinstance(instance, model)
+                ]
+                if not items:
+                    continue
+                index = self.indexes[kind]
+                if deleted:
+                    for instance in items:
+                        index.remove(instance.pk)
+                elif len(items) == 1:
+                    index.add({
+                        field: getattr(items[0], field) for field in fields
+                    })
+                else:
+                    index.add_many(
+                        {field: getattr(instance, field) for field in fields}
+                        for instance in items
+                    )
+            if self.versions == shared:
+                self.versions = tuple(
+                    bumped.get(model, version)
+                    for model, version in zip(self.models, shared)
+                )
+
+
+autocomplete_index = AutocompleteIndex()
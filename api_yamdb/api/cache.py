@@ -0,0 +1,86 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.http import parse_etags, quote_etag, urlencode
+
+VERSION_KEY = 'api:version:{}'
+RESPONSE_KEY = 'api:response:{}'
+OBJECT_VERSION_KEY = 'api:object-version:{}'
+MISSING_VERSION = -1
+
+
+def version_key(model):
+    return VERSION_KEY.format(model._meta.label_lower)
+
+
+def get_versions(models):
+    """Возвращает текущие номера версий моделей одним обращением к кешу.
+
+    Отсутствующая версия заводится от текущего времени в наносекундах,
+    чтобы после вытеснения ключа из кеша не повторить старый номер.
+    """
+    keys = [version_key(model) for model in models]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[key] = cache.get(key)
+    return tuple(versions[key] for key in keys)
+
+
+def bump_version(model):
+    """Делает недействительными все ответы, зависящие от модели.
+
+    Версия заменяется новым значением, а не увеличивается: incr файлового
+    кеша читает и записывает значение отдельно, и одновременные записи
+    из двух процессов дали бы одну и ту же версию. Возвращает новую
+    версию.
+    """
+    version = time.time_ns()
+    cache.set(version_key(model), version, timeout=None)
+    return version
+
+
+def get_object_version(queryset, pk, versions):
+    """Значение поля `version` объекта или None, если объекта нет.
+
+    Значение кешируется до следующей записи в моделях с версиями
+    `versions`, поэтому повторные запросы не обращаются к базе данных.
+    """
+    raw_key = f'{queryset.model._meta.label_lower}:{pk}#{versions}'
+    key = OBJECT_VERSION_KEY.format(hashlib.md5(raw_key.encode()).hexdigest())
+    version = cache.get(key)
+    if version is None:
+        version = queryset.filter(pk=pk).values_list(
+            'version', flat=True
+        ).first()
+        if version is None:
+            version = MISSING_VERSION
+        cache.set(key, version, settings.API_RESPONSE_CACHE_TIMEOUT)
+    return None if version == MISSING_VERSION else version
+
+
+def response_cache_key(request, versions):
+    """Ключ ответа: путь, упорядоченные параметры запроса и версии."""
+    query = urlencode(sorted(request.query_params.lists()), doseq=True)
+    raw_key = f'{request.path}?{query}#{versions}'
+    return RESPONSE_KEY.format(hashlib.md5(raw_key.encode()).hexdigest())
+
+
+def response_etag(request, versions):
+    """ETag представления: версии данных и формат ответа."""
+    raw_tag = f'{request.accepted_renderer.format}#{versions}'
+    return quote_etag(hashlib.md5(raw_tag.encode()).hexdigest())
+
+
+def etag_matches(request, etag):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if not if_none_match:
+        return False
+    etags = [
+        tag[2:] if tag.startswith('W/') else tag
+        for tag in parse_etags(if_none_match)
+    ]
+    return '*' in etags or etag in etags
@@ -0,0 +1,67 @@
+import csv
+
+from rest_framework.renderers import JSONRenderer
+
+from .serializers import TitleGetSerializer, TitleListSerializer
+
+CSV_FIELDS = (
+    'id', 'name', 'year', 'rating', 'review_count', 'description', 'genre',
+    'category'
+)
+
+
+class Echo:
+    """Файл, который возвращает записанную строку вместо буферизации."""
+
+    def write(self, value):
+        return value
+
+
+def iter_title_chunks(queryset, chunk_size):
+    """Произведения каталога пачками по `chunk_size` в виде словарей API.
+
+    Строки читаются курсором через iterator(), жанры загружаются одним
+    запросом на пачку, поэтому память не зависит от размера каталога.
+    """
+    serializer = TitleGetSerializer(many=True)
+    rows = []
+    for row in TitleListSerializer.values(queryset).iterator(
+        chunk_size=chunk_size
+    ):
+        rows.append(row)
+        if len(rows) == chunk_size:
+            yield serializer.to_representation(rows)
+            rows = []
+    if rows:
+        yield serializer.to_representation(rows)
+
+
+def export_ndjson(queryset, chunk_size):
+    renderer = JSONRenderer()
+    for titles in iter_title_chunks(queryset, chunk_size):
+        yield b''.join(renderer.render(title) + b'\n' for title in titles)
+
+
+def export_csv(queryset, chunk_size):
+    writer = csv.writer(Echo())
+    yield writer.writerow(CSV_FIELDS)
+    for titles in iter_title_chunks(queryset, chunk_size):
+        yield ''.join(
+            writer.writerow((
+                title['id'],
+                title['name'],
+                title['year'],
+                title['rating'],
+                title['review_count'],
+                title['description'],
+                ','.join(genre['slug'] for genre in title['genre']),
+                title['category'] and title['category']['slug'],
+            ))
+            for title in titles
+        )
+
+
+EXPORT_FORMATS = {
+    'ndjson': (export_ndjson, 'application/x-ndjson'),
+    'csv': (export_csv, 'text/csv; charset=utf-8'),
+}
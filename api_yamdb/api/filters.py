@@ -1,5 +1,10 @@
+import sys
+
+from django.db.models import Count, FilteredRelation, Q
 from django_filters import rest_framework as filters
-from reviews.models import Title
+from rest_framework.exceptions import ValidationError
+from reviews.models import Category, Genre, Title, TitleFacet, User
+from reviews.search import search_titles
 
 
 class TitleFilter(filters.FilterSet):
@@ -8,7 +13,135 @@ class TitleFilter(filters.FilterSet):
     category = filters.CharFilter(field_name='category__slug')
     name = filters.CharFilter(field_name='name', lookup_expr='icontains')
     year = filters.NumberFilter(field_name='year')
+    search = filters.CharFilter(method='filter_search')
 
     class Meta:
         model = Title
-        fields = ('genre', 'category', 'name', 'year')
+        fields = ('genre', 'category', 'name', 'year', 'search')
+
+    def filter_search(self, queryset, name, value):
+        return search_titles(queryset, value)
+
+
+def prefix_range(field, prefix):
+    """Условие "поле начинается с prefix" в виде диапазона значений.
+
+    В отличие от LIKE 'prefix%' диапазон читается по обычному индексу
+    поля на любой базе данных. Сравнение учитывает регистр.
+    """
+    last = ord(prefix[-1])
+    if last == sys.maxunicode:
+        return Q(**{f'{field}__gte': prefix})
+    return Q(**{
+        f'{field}__gte': prefix,
+        f'{field}__lt': prefix[:-1] + chr(last + 1),
+    })
+
+
+class UserFilter(filters.FilterSet):
+    """Поиск пользователей по индексам username и email.
+
+    `username` и `email` ищут точное совпадение, `*_prefix` - значения,
+    начинающиеся с переданной строки. Поиск по подстроке - параметр
+    `search`.
+    """
+    username = filters.CharFilter(field_name='username')
+    username_prefix = filters.CharFilter(
+        field_name='username', method='filter_prefix'
+    )
+    email = filters.CharFilter(field_name='email')
+    email_prefix = filters.CharFilter(
+        field_name='email', method='filter_prefix'
+    )
+
+    class Meta:
+        model = User
+        fields = ('username', 'username_prefix', 'email', 'email_prefix')
+
+    def filter_prefix(self, queryset, name, value):
+        field = self.filters[name].field_name
+        return queryset.filter(prefix_range(field, value))
+
+
+FACET_MODELS = {
+    TitleFacet.GENRE: Genre,
+    TitleFacet.CATEGORY: Category,
+}
+
+
+def parse_facets(value):
+    """Проверяет список фасетов из параметра `facets`."""
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    allowed = dict(TitleFacet.FACETS)
+    unknown = [name for name in names if name not in allowed]
+    if unknown:
+        raise ValidationError({'facets': (
+            f'Неизвестные фасеты: {", ".join(unknown)}. '
+            f'Доступны: {", ".join(allowed)}.'
+        )})
+    return list(dict.fromkeys(names))
+
+
+def get_title_facets(queryset, names, filtered):
+    """Количество произведений по значениям фасетов.
+
+    Без фильтров счетчики читаются из таблицы TitleFacet, не обращаясь к
+    таблице произведений; с фильтрами каждый фасет считается одним
+    сгруппированным запросом по отфильтрованным произведениям.
+    """
+    if filtered:
+        counts = get_filtered_facet_counts(queryset.order_by(), names)
+    else:
+        counts = get_stored_facet_counts(names)
+    return {
+        name: [
+            {'value': value, 'count': count}
+            for value, count in sorted(
+                counts[name], key=lambda item: (-item[1], item[0])
+            )
+        ]
+        for name in names
+    }
+
+
+def get_stored_facet_counts(names):
+    counts = {name: [] for name in names}
+    rows = TitleFacet.objects.filter(facet__in=names, count__gt=0)
+    keys = {name: [] for name in names}
+    for row in rows:
+        keys[row.facet].append((row.key, row.count))
+    for name, items in keys.items():
+        if name in FACET_MODELS:
+            slugs = dict(FACET_MODELS[name].objects.filter(
+                pk__in=[key for key, _ in items]
+            ).values_list('pk', 'slug'))
+            items = [
+                (slugs[key], count) for key, count in items if key in slugs
+            ]
+        counts[name] = items
+    return counts
+
+
+def get_filtered_facet_counts(queryset, names):
+    # Жанры считаются по отдельному соединению: соединение из фильтра
+    # `genre` оставило бы в счетчиках только выбранный жанр. Подзапрос
+    # по id произведений не подходит, так как условия поиска ссылаются на
+    # таблицу произведений по имени.
+    queryset = queryset.alias(facet_genre=FilteredRelation(
+        'genre', condition=Q(genre__slug__isnull=False)
+    ))
+    fields = {
+        TitleFacet.GENRE: 'facet_genre__slug',
+        TitleFacet.CATEGORY: 'category__slug',
+        TitleFacet.YEAR: 'year',
+    }
+    counts = {}
+    for name in names:
+        field = fields[name]
+        counts[name] = list(
+            queryset.filter(**{f'{field}__isnull': False})
+            .order_by()
+            .values_list(field)
+            .annotate(Count('pk', distinct=True))
+        )
+    return counts
@@ -0,0 +1,119 @@
+import atexit
+import logging
+import queue
+import threading
+
+from django.conf import settings
+from django.contrib.auth.tokens import default_token_generator
+from django.core.mail import EmailMessage, get_connection
+
+logger = logging.getLogger(__name__)
+
+
+def confirmation_message(user):
+    """Письмо с кодом подтверждения для получения токена."""
+    confirmation_code = default_token_generator.make_token(user)
+    return EmailMessage(
+        'Код подтверждения',
+        f'Ваш код подтверждения: {confirmation_code}',
+        settings.EMAIL,
+        [user.email],
+    )
+
+
+class MailQueue:
+    """Очередь писем, которую разбирает фоновый поток.
+
+    Поток забирает до EMAIL_QUEUE_BATCH_SIZE писем и отправляет их через
+    одно соединение с почтовым сервером. Неотправленное письмо
+    возвращается в очередь через EMAIL_QUEUE_RETRY_DELAY * номер попытки
+    секунд, после EMAIL_QUEUE_MAX_RETRIES неудачных попыток
+    записывается в лог. При EMAIL_QUEUE_ASYNC = False письма отправляются
+    сразу в вызывающем потоке.
+    """
+
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def enqueue(self, messages):
+        if not settings.EMAIL_QUEUE_ASYNC:
+            with get_connection(fail_silently=False) as connection:
+                connection.send_messages(messages)
+            return
+        for message in messages:
+            self.queue.put((message, 1))
+        self.start()
+
+    def start(self):
+        with self.lock:
+            if self.thread is None:
+                atexit.register(self.join, settings.EMAIL_QUEUE_EXIT_TIMEOUT)
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(
+                    target=self.run, name='mail-queue', daemon=True
+                )
+                self.thread.start()
+
+    def run(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < settings.EMAIL_QUEUE_BATCH_SIZE:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            for item in self.deliver(batch):
+                self.retry(*item)
+            for _ in batch:
+                self.queue.task_done()
+
+    def deliver(self, batch):
+        """Отправляет пачку писем; возвращает неотправленные."""
+        failed = []
+        pending = iter(batch)
+        try:
+            with get_connection(fail_silently=False) as connection:
+                for message, attempt in pending:
+                    try:
+                        connection.send_messages([message])
+                    except Exception:
+                        logger.warning('Письмо для %s не отправлено, '
+                                       'попытка %s', message.to, attempt,
+                                       exc_info=True)
+                        failed.append((message, attempt))
+        except Exception:
+            logger.warning('Нет соединения с почтовым сервером',
+                           exc_info=True)
+        return failed + list(pending)
+
+    def retry(self, message, attempt):
+        if attempt >= settings.EMAIL_QUEUE_MAX_RETRIES:
+            logger.error('Письмо для %s не отправлено после %s попыток',
+                         message.to, attempt)
+            return
+        # Отложенное письмо считается незавершенным, пока не вернется
+        # в очередь: join() дождется и повторных попыток.
+        with self.queue.mutex:
+            self.queue.unfinished_tasks += 1
+        timer = threading.Timer(
+            settings.EMAIL_QUEUE_RETRY_DELAY * attempt,
+            self.requeue, ((message, attempt + 1),)
+        )
+        timer.daemon = True
+        timer.start()
+
+    def requeue(self, item):
+        self.queue.put(item)
+        self.queue.task_done()
+
+    def join(self, timeout=None):
+        """Ждет отправки всех писем из очереди; False по таймауту."""
+        with self.queue.all_tasks_done:
+            return self.queue.all_tasks_done.wait_for(
+                lambda: not self.queue.unfinished_tasks, timeout
+            )
+
+
+mail_queue = MailQueue()
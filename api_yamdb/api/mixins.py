@@ -0,0 +1,251 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import ForeignKey, ManyToManyField
+from django.db.models.constants import LOOKUP_SEP
+from django.shortcuts import get_object_or_404
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from .cache import (etag_matches, get_versions, response_cache_key,
+                    response_etag)
+
+
+class CursorPaginationMixin:
+    """Включает курсорную пагинацию, если в запросе передан `cursor`.
+
+    Без параметра `cursor` используется пагинация по умолчанию
+    (limit/offset), поэтому существующие клиенты продолжают работать.
+    Первую страницу в курсорном режиме можно получить с пустым `?cursor=`.
+    Параметры из `cursor_excluded_params` задают свою сортировку, которую
+    курсор не поддерживает: с ними используется пагинация по умолчанию.
+    """
+    cursor_pagination_class = None
+    cursor_excluded_params = ()
+
+    @property
+    def paginator(self):
+        if (
+            not hasattr(self, '_paginator')
+            and self.cursor_pagination_class is not None
+            and self.cursor_pagination_class.cursor_query_param
+            in self.request.query_params
+            and not any(
+                param in self.request.query_params
+                for param in self.cursor_excluded_params
+            )
+        ):
+            self._paginator = self.cursor_pagination_class()
+        return super().paginator
+
+
+class NestedResourceMixin:
+    """Объекты вложенного URL (`/titles/{title_id}/reviews/{review_id}/`).
+
+    `parent_lookups` сопоставляет поля родительской модели `parent_field`
+    с параметрами URL. Объекты фильтруются по всем параметрам сразу,
+    поэтому детальный запрос выполняется одним запросом с JOIN и дает
+    404, если не совпадает любой из родителей. Родитель загружается
+    (тоже одним запросом) только для списка - чтобы отличить пустой
+    список от несуществующего родителя - и по требованию через
+    `get_parent()`.
+    """
+    parent_model = None
+    parent_field = None
+    parent_lookups = {}
+
+    def get_parent(self):
+        if not hasattr(self, '_parent'):
+            self._parent = get_object_or_404(self.parent_model, **{
+                field: self.kwargs[kwarg]
+                for field, kwarg in self.parent_lookups.items()
+            })
+        return self._parent
+
+    def get_queryset(self):
+        if self.action == 'list':
+            self.get_parent()
+        return super().get_queryset().filter(**{
+            f'{self.parent_field}{LOOKUP_SEP}{field}': self.kwargs[kwarg]
+            for field, kwarg in self.parent_lookups.items()
+        })
+
+
+class SparseFieldsMixin:
+    """Ограничивает поля ответа параметром `fields` (`?fields=id,name`).
+
+    Невыбранные поля убираются из сериализатора, из базы данных через
+    only() читаются только столбцы выбранных полей, а связанные объекты
+    невыбранных полей не загружаются select_related и prefetch_related.
+    Первичный ключ и поля сортировки читаются всегда: по ним строится
+    курсор пагинации.
+    """
+    fields_query_param = 'fields'
+    sparse_fields_actions = ('list', 'retrieve')
+
+    def get_sparse_fields(self):
+        if hasattr(self, '_sparse_fields'):
+            return self._sparse_fields
+        self._sparse_fields = None
+        value = self.request.query_params.get(self.fields_query_param)
+        if self.action not in self.sparse_fields_actions or not value:
+            return None
+        names = [name.strip() for name in value.split(',') if name.strip()]
+        available = self.get_serializer_class()().fields
+        unknown = [name for name in names if name not in available]
+        if unknown:
+            raise ValidationError({self.fields_query_param: (
+                f'Неизвестные поля: {", ".join(unknown)}. '
+                f'Доступны: {", ".join(available)}.'
+            )})
+        self._sparse_fields = set(names)
+        return self._sparse_fields
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['fields'] = self.get_sparse_fields()
+        return context
+
+    def filter_queryset(self, queryset):
+        return self.project_queryset(super().filter_queryset(queryset))
+
+    def project_queryset(self, queryset):
+        """Читает из базы данных только столбцы полей из `fields`."""
+        names = self.get_sparse_fields()
+        if names is None:
+            return queryset
+        loaded, skipped = self.resolve_sparse_fields(
+            queryset.model, names, self.required_columns(queryset)
+        )
+        if skipped:
+            queryset = self.skip_related(queryset, skipped)
+        return queryset.only(*loaded) if loaded is not None else queryset
+
+    def required_columns(self, queryset):
+        """Столбцы, нужные независимо от `fields`: первичный ключ и поля
+        сортировки."""
+        model = queryset.model
+        ordering = getattr(self.paginator, 'ordering', None) or ()
+        if isinstance(ordering, str):
+            ordering = (ordering,)
+        local_fields = {field.name for field in model._meta.concrete_fields}
+        return {model._meta.pk.name} | {
+            name.lstrip('-') for name in (*ordering, *queryset.query.order_by)
+            if isinstance(name, str) and name.lstrip('-') in local_fields
+        } | {
+            # Внешний ключ к объекту связанного менеджера
+            # (`title.reviews.all()`) сверяется с ним у каждой строки.
+            field.name for field in queryset._known_related_objects
+        }
+
+    def resolve_sparse_fields(self, model, names, loaded):
+        """Возвращает столбцы для чтения (None - все) и связи полей,
+        не попавших в `fields`."""
+        skipped = set()
+        for name, field in self.get_serializer_class()().fields.items():
+            try:
+                model_field = model._meta.get_field(field.source)
+            except FieldDoesNotExist:
+                if name in names:
+                    # Неизвестно, какие столбцы нужны полю: читаем все.
+                    loaded = None
+                continue
+            if name not in names:
+                if isinstance(model_field, (ForeignKey, ManyToManyField)):
+                    skipped.add(model_field.name)
+            elif loaded is not None and model_field.concrete and (
+                not model_field.many_to_many
+            ):
+                loaded.add(model_field.name)
+        return loaded, skipped
+
+    def skip_related(self, queryset, skipped):
+        """Убирает из select_related и prefetch_related связи `skipped`."""
+        select_related = queryset.query.select_related
+        if isinstance(select_related, dict):
+            queryset = queryset.select_related(None).select_related(*(
+                path for path in related_paths(select_related)
+                if path.split(LOOKUP_SEP)[0] not in skipped
+            ))
+        prefetch_related = queryset._prefetch_related_lookups
+        if prefetch_related:
+            queryset = queryset.prefetch_related(None).prefetch_related(*(
+                lookup for lookup in prefetch_related
+                if getattr(lookup, 'prefetch_through', lookup).split(
+                    LOOKUP_SEP
+                )[0] not in skipped
+            ))
+        return queryset
+
+
+def related_paths(select_related, prefix=''):
+    """Пути связей из словаря `Query.select_related`."""
+    for name, nested in select_related.items():
+        path = f'{prefix}{name}'
+        if nested:
+            yield from related_paths(nested, f'{path}{LOOKUP_SEP}')
+        else:
+            yield path
+
+
+class ResponseCacheMixin:
+    """Кеширует ответы анонимным пользователям до изменения данных.
+
+    В ключ ответа входят версии моделей из `cache_models`, которые
+    увеличиваются сигналами при каждой записи, поэтому устаревший ответ
+    никогда не отдается, а инвалидация не требует перебора ключей.
+    Из тех же версий строится ETag: если он совпадает с `If-None-Match`,
+    клиент получает `304 Not Modified` без сериализации ответа.
+    Версии отдельного объекта задает `get_cache_versions`; None означает,
+    что объекта нет, и запрос обрабатывается без кеша и ETag.
+    """
+    cache_models = ()
+
+    def get_cache_versions(self):
+        return get_versions(self.cache_models)
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        if not self.cache_models:
+            return handler(request, *args, **kwargs)
+        versions = self.get_cache_versions()
+        if versions is None:
+            return handler(request, *args, **kwargs)
+        etag = response_etag(request, versions)
+        if etag_matches(request, etag):
+            return Response(
+                status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag}
+            )
+        if request.user.is_authenticated:
+            response = handler(request, *args, **kwargs)
+        else:
+            response = self.get_anonymous_response(
+                response_cache_key(request, versions),
+                handler, request, *args, **kwargs
+            )
+        if response.status_code == status.HTTP_200_OK:
+            response['ETag'] = etag
+        return response
+
+    def get_anonymous_response(self, key, handler, request, *args, **kwargs):
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data, settings.API_RESPONSE_CACHE_TIMEOUT)
+        return response
+
+
+class CachedListMixin(ResponseCacheMixin):
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+
+class CachedRetrieveMixin(ResponseCacheMixin):
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
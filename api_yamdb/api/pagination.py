@@ -0,0 +1,15 @@
+from rest_framework.pagination import CursorPagination
+
+
+class TitleCursorPagination(CursorPagination):
+    """Курсорная пагинация произведений по убыванию id."""
+    ordering = '-id'
+    page_size_query_param = 'limit'
+    max_page_size = 100
+
+
+class PubDateCursorPagination(CursorPagination):
+    """Курсорная пагинация отзывов и комментариев от новых к старым."""
+    ordering = ('-pub_date', '-id')
+    page_size_query_param = 'limit'
+    max_page_size = 100
@@ -1,7 +1,27 @@
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
 from rest_framework import serializers
 
-from reviews.models import Category, Comment, Genre, Review, Title, User
+from reviews.models import (ROLE, Category, Comment, Genre, GenreTitle,
+                            Review, Title, User)
+from reviews.signals import titles_bulk_saved
 from reviews.validators import validate_username
+from .mail import confirmation_message, mail_queue
+from .snapshots import category_snapshot, genre_snapshot
+
+
+class SparseFieldsSerializerMixin:
+    """Оставляет только поля, перечисленные в `fields` контекста."""
+
+    def get_fields(self):
+        fields = super().get_fields()
+        names = self.context.get('fields')
+        if names is None:
+            return fields
+        return {
+            name: field for name, field in fields.items() if name in names
+        }
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -19,6 +39,160 @@ class UserSerializer(serializers.ModelSerializer):
         model = User
 
 
+class UserBulkListSerializer(serializers.ListSerializer):
+    """Пакетное создание пользователей.
+
+    Элементы проверяются по отдельности, занятые имена и адреса ищутся
+    в базе одним запросом на lookup_batch_size элементов. Элементы с
+    ошибками попадают в `rejected` и не мешают создать остальных
+    пользователей одним bulk_create. Письма с кодами подтверждения
+    ставятся в очередь после фиксации транзакции.
+    """
+    lookup_batch_size = 500
+
+    def to_internal_value(self, data):
+        if not isinstance(data, list):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not data:
+            self.fail('empty')
+        if len(data) > settings.USERS_BULK_MAX_ITEMS:
+            raise serializers.ValidationError({'non_field_errors': [
+                'Слишком много пользователей в одном запросе, максимум '
+                f'{settings.USERS_BULK_MAX_ITEMS}.'
+            ]})
+        self.rejected = []
+        items = self.validate_items(data)
+        accepted = self.accept_items(items, self.find_taken(items))
+        self.rejected.sort(key=lambda error: error['index'])
+        return accepted
+
+    def validate_items(self, data):
+        """Проверяет элементы по отдельности; возвращает пары (индекс,
+        данные) прошедших проверку."""
+        items = []
+        for index, item in enumerate(data):
+            try:
+                items.append((index, self.child.run_validation(item)))
+            except serializers.ValidationError as exc:
+                self.rejected.append({'index': index, 'errors': exc.detail})
+        return items
+
+    def find_taken(self, items):
+        """Имена и адреса элементов, уже занятые в базе."""
+        taken = {'username': set(), 'email': set()}
+        for field, values in taken.items():
+            candidates = list({item[field] for _, item in items})
+            for start in range(0, len(candidates), self.lookup_batch_size):
+                values.update(User.objects.filter(**{
+                    f'{field}__in': candidates[
+                        start:start + self.lookup_batch_size
+                    ]
+                }).values_list(field, flat=True))
+        return taken
+
+    def accept_items(self, items, taken):
+        """Отбрасывает элементы с занятыми или повторяющимися в пакете
+        именами и адресами."""
+        accepted = []
+        self.accepted_indexes = []
+        for index, item in items:
+            errors = {
+                field: [f'Пользователь с таким {field} уже существует.']
+                for field, values in taken.items() if item[field] in values
+            }
+            if errors:
+                self.rejected.append({'index': index, 'errors': errors})
+                continue
+            for field, values in taken.items():
+                values.add(item[field])
+            accepted.append(item)
+            self.accepted_indexes.append(index)
+        return accepted
+
+    def create(self, validated_data):
+        users = [User(**item) for item in validated_data]
+        if not users:
+            return users
+        with transaction.atomic():
+            try:
+                with transaction.atomic():
+                    User.objects.bulk_create(users)
+            except IntegrityError:
+                # Имя или адрес заняли параллельным запросом после
+                # проверки пакета: такие элементы попадают в `rejected`.
+                users = self.create_each(users)
+            else:
+                self.set_pks(users)
+            transaction.on_commit(lambda: mail_queue.enqueue(
+                [confirmation_message(user) for user in users]
+            ))
+        self.rejected.sort(key=lambda error: error['index'])
+        return users
+
+    def set_pks(self, users):
+        """Первичные ключи созданных пользователей по уникальному username.
+
+        Без RETURNING bulk_create не заполняет первичные ключи, а от них
+        зависит код подтверждения.
+        """
+        if all(user.pk is not None for user in users):
+            return
+        pks = {}
+        usernames = [user.username for user in users]
+        for start in range(0, len(usernames), self.lookup_batch_size):
+            pks.update(User.objects.filter(
+                username__in=usernames[start:start + self.lookup_batch_size]
+            ).values_list('username', 'pk'))
+        for user in users:
+            user.pk = pks[user.username]
+
+    def create_each(self, users):
+        created = []
+        for index, user in zip(self.accepted_indexes, users):
+            try:
+                with transaction.atomic():
+                    user.save()
+            except IntegrityError:
+                errors = {
+                    field: [f'Пользователь с таким {field} уже существует.']
+                    for field in ('username', 'email')
+                    if User.objects.filter(
+                        **{field: getattr(user, field)}
+                    ).exists()
+                }
+                self.rejected.append({'index': index, 'errors': errors or {
+                    'non_field_errors': ['Пользователь не создан.']
+                }})
+            else:
+                created.append(user)
+        return created
+
+
+class UserBulkSerializer(serializers.Serializer):
+    """Пользователь в пакетном создании.
+
+    Уникальность username и email проверяется для всего пакета сразу.
+    """
+    username = serializers.CharField(
+        max_length=150,
+        validators=(validate_username,)
+    )
+    email = serializers.EmailField(max_length=254)
+    first_name = serializers.CharField(
+        max_length=150, required=False, allow_blank=True
+    )
+    last_name = serializers.CharField(
+        max_length=150, required=False, allow_blank=True
+    )
+    bio = serializers.CharField(
+        required=False, allow_blank=True, allow_null=True
+    )
+    role = serializers.ChoiceField(choices=ROLE, default='user')
+
+    class Meta:
+        list_serializer_class = UserBulkListSerializer
+
+
 class SignUpSerializer(serializers.Serializer):
     """Сериализатор объектов типа User при регистрации."""
     username = serializers.CharField(
@@ -35,6 +209,19 @@ class TokenSerializer(serializers.Serializer):
     confirmation_code = serializers.CharField()
 
 
+class AutocompleteSerializer(serializers.Serializer):
+    """Сериализатор параметров подсказок при поиске."""
+    q = serializers.CharField(max_length=256, trim_whitespace=False)
+    limit = serializers.IntegerField(min_value=1, max_value=50, default=10)
+
+
+class TopTitlesSerializer(serializers.Serializer):
+    """Сериализатор параметров топа произведений."""
+    category = serializers.SlugField(required=False)
+    genre = serializers.SlugField(required=False)
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=10)
+
+
 class CategorySerializer(serializers.ModelSerializer):
     """Сериалайзер для модели категория."""
 
@@ -43,12 +230,28 @@ class CategorySerializer(serializers.ModelSerializer):
         model = Category
 
 
-class CategoryGetField(serializers.SlugRelatedField):
-    """Сериалайзер для поля модели категория."""
+class SnapshotSlugRelatedField(serializers.SlugRelatedField):
+    """Поле слага, которое ищет объекты в снимке таблицы в памяти.
+
+    Слаг, которого нет в снимке (например, объект создан в еще не
+    зафиксированной транзакции), ищется в базе данных как обычно.
+    """
+    snapshot = None
+
+    def to_internal_value(self, data):
+        if self.slug_field == 'slug' and isinstance(data, str):
+            instance = self.snapshot.get(data)
+            if instance is not None:
+                return instance
+        return super().to_internal_value(data)
 
     def to_representation(self, value):
-        serializer = CategorySerializer(value)
-        return serializer.data
+        return {'name': value.name, 'slug': value.slug}
+
+
+class CategoryGetField(SnapshotSlugRelatedField):
+    """Сериалайзер для поля модели категория."""
+    snapshot = category_snapshot
 
 
 class GenreSerializer(serializers.ModelSerializer):
@@ -59,27 +262,90 @@ class GenreSerializer(serializers.ModelSerializer):
         model = Genre
 
 
-class GenreGetField(serializers.SlugRelatedField):
+class GenreGetField(SnapshotSlugRelatedField):
     """Сериалайзер для поля модели жанры."""
-
-    def to_representation(self, value):
-        serializer = GenreSerializer(value)
-        return serializer.data
-
-
-class TitleGetSerializer(serializers.ModelSerializer):
+    snapshot = genre_snapshot
+
+
+class TitleListSerializer(serializers.ListSerializer):
+    """Список произведений для чтения без вызова полей DRF на каждый объект.
+
+    Строки `.values()` (см. `values`) превращаются в словари напрямую, а
+    жанры всей страницы загружаются одним запросом. Результат совпадает с
+    ответом TitleGetSerializer; страницы из объектов моделей, например в
+    топе произведений, сериализуются обычным способом.
+    """
+    columns = {
+        'id': ('id',),
+        'name': ('name',),
+        'year': ('year',),
+        'rating': ('rating',),
+        'review_count': ('review_count',),
+        'description': ('description',),
+        'genre': (),
+        'category': ('category__name', 'category__slug'),
+    }
+
+    @classmethod
+    def values(cls, queryset, fields=None):
+        """Строки для быстрой сериализации вместо объектов модели."""
+        return queryset.prefetch_related(None).values('id', *(
+            column for name, columns in cls.columns.items()
+            if fields is None or name in fields
+            for column in columns
+        ))
+
+    def to_representation(self, data):
+        rows = list(data)
+        if not rows or not isinstance(rows[0], dict):
+            return super().to_representation(rows)
+        names = list(self.child.fields)
+        genres = {}
+        if 'genre' in names:
+            for title_id, name, slug in GenreTitle.objects.filter(
+                title__in=[row['id'] for row in rows]
+            ).order_by('id').values_list(
+                'title_id', 'genre__name', 'genre__slug'
+            ):
+                genres.setdefault(title_id, []).append(
+                    {'name': name, 'slug': slug}
+                )
+        result = []
+        for row in rows:
+            item = {}
+            for name in names:
+                if name == 'genre':
+                    item[name] = genres.get(row['id'], [])
+                elif name == 'category':
+                    item[name] = None if row['category__slug'] is None else {
+                        'name': row['category__name'],
+                        'slug': row['category__slug'],
+                    }
+                elif name == 'rating':
+                    item[name] = (
+                        None if row['rating'] is None else int(row['rating'])
+                    )
+                else:
+                    item[name] = row[name]
+            result.append(item)
+        return result
+
+
+class TitleGetSerializer(SparseFieldsSerializerMixin,
+                         serializers.ModelSerializer):
     """Сериалайзер для модели произведения(только чтение)."""
     category = CategorySerializer(read_only=True)
     genre = GenreSerializer(many=True, read_only=True)
-    rating = serializers.IntegerField()
+    rating = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = Title
         fields = [
-            'id', 'name', 'year', 'rating',
+            'id', 'name', 'year', 'rating', 'review_count',
             'description', 'genre', 'category'
         ]
         read_only_fields = fields
+        list_serializer_class = TitleListSerializer
 
 
 class TitleSerializer(serializers.ModelSerializer):
@@ -92,11 +358,199 @@ class TitleSerializer(serializers.ModelSerializer):
     )
 
     class Meta:
-        fields = '__all__'
+        exclude = ('score_sum', 'review_count', 'rating')
         model = Title
 
 
-class ReviewSerializer(serializers.ModelSerializer):
+class TitleBulkListSerializer(serializers.ListSerializer):
+    """Пакетная загрузка произведений.
+
+    Слаги категорий и жанров проверяются по снимкам таблиц в памяти, записи
+    сохраняются через bulk_create и bulk_update в одной транзакции.
+    Ошибки возвращаются списком по одной записи на каждый элемент пакета.
+    """
+    lookup_batch_size = 500
+
+    def to_internal_value(self, data):
+        if (isinstance(data, list)
+                and len(data) > settings.TITLES_BULK_MAX_ITEMS):
+            raise serializers.ValidationError({'non_field_errors': [
+                'Слишком много произведений в одном запросе, максимум '
+                f'{settings.TITLES_BULK_MAX_ITEMS}.'
+            ]})
+        items = super().to_internal_value(data)
+        categories = {
+            slug: category.pk for slug, category in category_snapshot.get_many(
+                {item['category'] for item in items}
+            ).items()
+        }
+        genres = {
+            slug: genre.pk for slug, genre in genre_snapshot.get_many(
+                {slug for item in items for slug in item['genre']}
+            ).items()
+        }
+        titles = Title.objects.in_bulk(
+            {item['id'] for item in items if 'id' in item}
+        )
+        does_not_exist = (
+            serializers.SlugRelatedField.default_error_messages[
+                'does_not_exist'
+            ]
+        )
+        errors = []
+        seen_ids = set()
+        for item in items:
+            error = {}
+            if item['category'] not in categories:
+                error['category'] = [does_not_exist.format(
+                    slug_name='slug', value=item['category']
+                )]
+            missing = [slug for slug in item['genre'] if slug not in genres]
+            if missing:
+                error['genre'] = [
+                    does_not_exist.format(slug_name='slug', value=slug)
+                    for slug in missing
+                ]
+            if 'id' in item:
+                if item['id'] not in titles:
+                    error['id'] = [f'Произведение {item["id"]} не найдено.']
+                elif item['id'] in seen_ids:
+                    error['id'] = [
+                        f'Произведение {item["id"]} повторяется в пакете.'
+                    ]
+                seen_ids.add(item['id'])
+            errors.append(error)
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        for item in items:
+            item['title'] = titles.get(item.get('id'))
+            item['category_id'] = categories[item['category']]
+            item['genre_ids'] = list(dict.fromkeys(
+                genres[slug] for slug in item['genre']
+            ))
+        return items
+
+    def create(self, validated_data):
+        titles = []
+        for item in validated_data:
+            title = item['title'] or Title()
+            title.name = item['name']
+            title.year = item['year']
+            title.description = item.get('description')
+            title.category_id = item['category_id']
+            titles.append(title)
+        new_titles = [title for title in titles if title.pk is None]
+        old_titles = [title for title in titles if title.pk is not None]
+        with transaction.atomic():
+            self.insert_titles(new_titles)
+            for title in old_titles:
+                title.version = F('version') + 1
+            Title.objects.bulk_update(
+                old_titles,
+                ('name', 'year', 'description', 'category', 'version'),
+                batch_size=self.lookup_batch_size
+            )
+            old_links = {}
+            for start in range(0, len(old_titles), self.lookup_batch_size):
+                old_links.update({
+                    (title_id, genre_id): pk
+                    for pk, title_id, genre_id in GenreTitle.objects.filter(
+                        title__in=old_titles[
+                            start:start + self.lookup_batch_size
+                        ]
+                    ).values_list('pk', 'title_id', 'genre_id')
+                })
+            new_links = [
+                GenreTitle(
+                    title_id=title.pk,
+                    genre_id=genre_id,
+                    top_rating=title.top_rating
+                )
+                for title, item in zip(titles, validated_data)
+                for genre_id in item['genre_ids']
+                if (title.pk, genre_id) not in old_links
+            ]
+            kept_links = {
+                (title.pk, genre_id)
+                for title, item in zip(titles, validated_data)
+                for genre_id in item['genre_ids']
+            }
+            stale_links = {
+                link: pk for link, pk in old_links.items()
+                if link not in kept_links
+            }
+            stale_pks = list(stale_links.values())
+            for start in range(0, len(stale_pks), self.lookup_batch_size):
+                GenreTitle.objects.filter(
+                    pk__in=stale_pks[start:start + self.lookup_batch_size]
+                ).delete()
+            GenreTitle.objects.bulk_create(new_links)
+            titles_bulk_saved.send(
+                sender=Title,
+                titles=titles,
+                genre_ids={link.genre_id for link in new_links} | {
+                    genre_id for _, genre_id in stale_links
+                }
+            )
+        for title, item in zip(titles, validated_data):
+            item['id'] = title.pk
+        return validated_data
+
+    def insert_titles(self, titles):
+        """Вставляет новые произведения и заполняет их первичные ключи.
+
+        Без RETURNING bulk_create не заполняет первичные ключи, а они
+        нужны для связей с жанрами. В SQLite ключи резервируются
+        увеличением счетчика AUTOINCREMENT первым запросом транзакции:
+        он сразу берет блокировку записи, поэтому параллельная вставка
+        получит следующие ключи, а ключи удаленных произведений не выдаются
+        повторно. На остальных базах без RETURNING произведения
+        вставляются по одному.
+        """
+        if not titles:
+            return
+        if connection.features.can_return_rows_from_bulk_insert:
+            Title.objects.bulk_create(titles)
+        elif connection.vendor == 'sqlite':
+            table = Title._meta.db_table
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'UPDATE sqlite_sequence SET seq = seq + %s '
+                    'WHERE name = %s', [len(titles), table]
+                )
+                if not cursor.rowcount:
+                    cursor.execute(
+                        'INSERT INTO sqlite_sequence (name, seq) '
+                        'SELECT %s, COALESCE(MAX(id), 0) + %s FROM '
+                        f'{connection.ops.quote_name(table)}',
+                        [table, len(titles)]
+                    )
+                cursor.execute(
+                    'SELECT seq FROM sqlite_sequence WHERE name = %s', [table]
+                )
+                last_id = cursor.fetchone()[0]
+            for pk, title in enumerate(titles, last_id - len(titles) + 1):
+                title.pk = pk
+            Title.objects.bulk_create(titles)
+        else:
+            for title in titles:
+                title.save()
+
+
+class TitleBulkSerializer(serializers.ModelSerializer):
+    """Сериалайзер произведения в пакетной загрузке."""
+    id = serializers.IntegerField(required=False)
+    category = serializers.SlugField()
+    genre = serializers.ListField(child=serializers.SlugField())
+
+    class Meta:
+        model = Title
+        fields = ('id', 'name', 'year', 'description', 'genre', 'category')
+        list_serializer_class = TitleBulkListSerializer
+
+
+class ReviewSerializer(SparseFieldsSerializerMixin,
+                       serializers.ModelSerializer):
     author = serializers.SlugRelatedField(
         slug_field='username',
         read_only=True
@@ -106,16 +560,33 @@ class ReviewSerializer(serializers.ModelSerializer):
         model = Review
         exclude = ['title']
 
-    def validate(self, data):
-        if self.context['request'].method == 'POST':
-            user = self.context['request'].user
-            title_id = self.context['view'].kwargs.get('title_id')
-            if Review.objects.filter(author=user, title_id=title_id).exists():
-                raise serializers.ValidationError('Вы уже оставили отзыв.')
-        return data
+
+class ReviewTitleSerializer(serializers.ModelSerializer):
+    """Краткие данные произведения в ленте отзывов пользователя."""
+
+    class Meta:
+        model = Title
+        fields = ('id', 'name', 'year')
+
+
+class UserReviewSerializer(serializers.ModelSerializer):
+    """Отзыв в ленте пользователя вместе с произведением."""
+    author = serializers.SlugRelatedField(
+        slug_field='username',
+        read_only=True
+    )
+    title = ReviewTitleSerializer(read_only=True)
+
+    class Meta:
+        model = Review
+        fields = (
+            'id', 'title', 'author', 'text', 'score', 'pub_date',
+            'comment_count'
+        )
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(SparseFieldsSerializerMixin,
+                        serializers.ModelSerializer):
     author = serializers.SlugRelatedField(
         slug_field='username',
         read_only=True
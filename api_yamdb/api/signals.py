@@ -0,0 +1,66 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from rest_framework_simplejwt.settings import api_settings
+
+from reviews.models import Category, Genre, GenreTitle, Review, Title, User
+from reviews.signals import titles_bulk_saved
+from .authentication import forget_user
+from .autocomplete import autocomplete_index
+from .cache import bump_version
+
+# Версии Title, Genre и Category поднимает индекс подсказок вместе с
+# обновлением индекса.
+CACHED_MODELS = (GenreTitle, Review)
+
+
+def bump_cached_model_version(sender, **kwargs):
+    """Сбрасывает кешированные ответы после фиксации записи в модели."""
+    transaction.on_commit(lambda: bump_version(sender))
+
+
+for model in CACHED_MODELS:
+    post_save.connect(bump_cached_model_version, sender=model)
+    post_delete.connect(bump_cached_model_version, sender=model)
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def bump_title_genres_version(sender, action, **kwargs):
+    if action.startswith('post_'):
+        transaction.on_commit(lambda: bump_version(GenreTitle))
+
+
+@receiver(titles_bulk_saved, sender=Title)
+def bump_titles_bulk_version(sender, titles, **kwargs):
+    """После пакетной записи индекс подсказок обновляется одной
+    сортировкой, без перестройки по новой версии модели."""
+    def bump():
+        bump_version(GenreTitle)
+        autocomplete_index.update_many(titles)
+    transaction.on_commit(bump)
+
+
+@receiver(post_save, sender=Title)
+@receiver(post_save, sender=Genre)
+@receiver(post_save, sender=Category)
+def autocomplete_item_saved(sender, instance, **kwargs):
+    transaction.on_commit(lambda: autocomplete_index.update(instance))
+
+
+@receiver(post_delete, sender=Title)
+@receiver(post_delete, sender=Genre)
+@receiver(post_delete, sender=Category)
+def autocomplete_item_deleted(sender, instance, **kwargs):
+    transaction.on_commit(
+        lambda: autocomplete_index.update(instance, deleted=True)
+    )
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_snapshot(sender, instance, **kwargs):
+    """Смена роли или блокировка действует с первого же запроса."""
+    user_id = getattr(instance, api_settings.USER_ID_FIELD)
+    forget_user(user_id)
+    transaction.on_commit(lambda: forget_user(user_id))
@@ -0,0 +1,54 @@
+import copy
+import threading
+
+from reviews.models import Category, Genre
+from .cache import get_versions
+
+
+class SlugSnapshot:
+    """Копия небольшой таблицы в памяти процесса с поиском по слагу.
+
+    Таблица перечитывается целиком, когда версия модели в кеше, которую
+    сигналы увеличивают при каждой записи, расходится с версией снимка.
+    Проверка версии - одно обращение к кешу, без запросов к базе данных.
+    Снимок общий для потоков, поэтому наружу отдаются копии объектов.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.lock = threading.Lock()
+        self.objects = None
+        self.version = None
+
+    def get_objects(self):
+        version = get_versions((self.model,))
+        with self.lock:
+            if self.objects is None or self.version != version:
+                self.objects = {
+                    instance.slug: instance
+                    for instance in self.model.objects.order_by()
+                }
+                self.version = version
+            return self.objects
+
+    def get(self, slug):
+        instance = self.get_objects().get(slug)
+        return copy.copy(instance) if instance is not None else None
+
+    def get_many(self, slugs):
+        """Объекты по слагам; отсутствующие в снимке ищутся в базе."""
+        objects = self.get_objects()
+        found = {
+            slug: copy.copy(objects[slug]) for slug in slugs if slug in objects
+        }
+        missing = set(slugs) - set(found)
+        if missing:
+            found.update(
+                (instance.slug, instance)
+                for instance in self.model.objects.filter(slug__in=missing)
+            )
+        return found
+
+
+category_snapshot = SlugSnapshot(Category)
+genre_snapshot = SlugSnapshot(Genre)
@@ -2,13 +2,15 @@ from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
 from .views import (CategoryViewSet, GenreViewSet, ReviewViewSet,
-                    TitleViewSet, UserViewSet, CommentViewSet,
-                    signup, get_token)
+                    TitleViewSet, UserViewSet, UserReviewViewSet,
+                    CommentViewSet, autocomplete, signup, get_token)
 
 app_name = 'api'
 
 router_v1 = DefaultRouter()
 router_v1.register(r'users', UserViewSet, basename='users')
+router_v1.register(r'users/(?P<username>[\w.@+-]+)/reviews',
+                   UserReviewViewSet, basename='user-reviews')
 router_v1.register(r'titles', TitleViewSet, basename='titles')
 router_v1.register(r'categories', CategoryViewSet, basename='categories')
 router_v1.register(r'genres', GenreViewSet, basename='genres')
@@ -24,6 +26,7 @@ auth_path = [
 ]
 
 urlpatterns = [
+    path('v1/autocomplete/', autocomplete, name='autocomplete'),
     path('v1/', include(router_v1.urls)),
     path('v1/', include(auth_path))
 ]
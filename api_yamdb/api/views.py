@@ -1,30 +1,47 @@
 from django.conf import settings
 from django.contrib.auth.tokens import default_token_generator
-from django.core.mail import send_mail
 from django.db import IntegrityError
-from django.db.models import Avg
+from django.db.models import Prefetch
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import (filters, status, permissions, serializers,
-                            mixins, viewsets)
+from rest_framework import (exceptions, filters, status, permissions,
+                            serializers, mixins, viewsets)
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.permissions import (AllowAny, IsAuthenticatedOrReadOnly)
-from rest_framework_simplejwt.tokens import AccessToken
 from rest_framework.viewsets import GenericViewSet, ModelViewSet
 
-from reviews.models import Genre, Category, Title, User, Review
-from .filters import TitleFilter
+from reviews.models import (Category, Comment, Genre, GenreTitle, Review,
+                            Title, User)
+from .authentication import access_token_for_user
+from .autocomplete import autocomplete_index
+from .cache import get_object_version
+from .export import EXPORT_FORMATS
+from .filters import (TitleFilter, UserFilter, get_title_facets,
+                      parse_facets)
+from .mail import confirmation_message, mail_queue
+from .mixins import (CachedListMixin, CachedRetrieveMixin,
+                     CursorPaginationMixin, NestedResourceMixin,
+                     SparseFieldsMixin)
+from .pagination import PubDateCursorPagination, TitleCursorPagination
 from .permissions import IsAdmin, IsAdminOrReadOnly, IsAuthorOrAdminOrModerOnly
 
 from .serializers import (
+    AutocompleteSerializer,
     CategorySerializer,
     GenreSerializer,
+    TitleBulkSerializer,
     TitleGetSerializer,
+    TitleListSerializer,
     TitleSerializer,
+    UserBulkSerializer,
     UserSerializer,
     SignUpSerializer,
     TokenSerializer,
+    TopTitlesSerializer,
+    UserReviewSerializer,
     ReviewSerializer,
     CommentSerializer,
 )
@@ -39,14 +56,32 @@ class UserViewSet(ModelViewSet):
         DjangoFilterBackend,
         filters.SearchFilter,
     )
+    filterset_class = UserFilter
     search_fields = ("username",)
     lookup_field = "username"
     http_method_names = ["get", "post", "patch", "delete"]
 
+    @action(methods=('post',), detail=False, url_path='bulk')
+    def bulk(self, request):
+        """Пакетное создание пользователей с отправкой кодов подтверждения.
+
+        Элементы с ошибками и конфликтами пропускаются и перечисляются в
+        `errors` вместе с их номером в пакете.
+        """
+        serializer = UserBulkSerializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(
+            {'created': serializer.data, 'errors': serializer.rejected},
+            status=(status.HTTP_201_CREATED if serializer.data
+                    else status.HTTP_400_BAD_REQUEST)
+        )
+
     @action(methods=('get', 'patch',), detail=False, url_path='me',
             permission_classes=(permissions.IsAuthenticated,))
     def user_own_account(self, request):
-        user = request.user
+        # request.user из снимка аутентификации содержит не все поля.
+        user = User.objects.get(pk=request.user.pk)
         if request.method == 'GET':
             serializer = self.get_serializer(user)
             return Response(serializer.data, status=status.HTTP_200_OK)
@@ -57,6 +92,33 @@ class UserViewSet(ModelViewSet):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
+class UserReviewViewSet(mixins.ListModelMixin, GenericViewSet):
+    """Отзывы пользователя от новых к старым.
+
+    `/users/me/reviews/` - отзывы текущего пользователя. Страница читается
+    по индексу (author, -pub_date, -id), произведения загружаются тем же
+    запросом через select_related.
+    """
+    serializer_class = UserReviewSerializer
+    pagination_class = PubDateCursorPagination
+    permission_classes = (AllowAny,)
+
+    def get_author(self):
+        username = self.kwargs['username']
+        if username != 'me':
+            return get_object_or_404(User, username=username)
+        if not self.request.user.is_authenticated:
+            raise exceptions.NotAuthenticated()
+        return self.request.user
+
+    def get_queryset(self):
+        # Автор подставляется связанным менеджером без JOIN.
+        return self.get_author().reviews.select_related('title').only(
+            'id', 'author', 'text', 'score', 'pub_date', 'comment_count',
+            'title__id', 'title__name', 'title__year'
+        )
+
+
 @api_view(["POST"])
 @permission_classes([AllowAny])
 def signup(request):
@@ -68,18 +130,11 @@ def signup(request):
     try:
         user, created = User.objects.get_or_create(
             username=username, email=email)
-        confirmation_code = default_token_generator.make_token(user)
     except IntegrityError:
         raise serializers.ValidationError(
             "Данные имя пользователя или Email уже зарегистрированы"
         )
-    send_mail(
-        "Код подтверждения",
-        f"Ваш код подтверждения: {confirmation_code}",
-        settings.EMAIL,
-        [user.email],
-        fail_silently=False,
-    )
+    mail_queue.enqueue([confirmation_message(user)])
     return Response(serializer.data, status=status.HTTP_200_OK)
 
 
@@ -92,99 +147,227 @@ def get_token(request):
     confirmation_code = serializer.validated_data["confirmation_code"]
     user = get_object_or_404(User, username=username)
     if default_token_generator.check_token(user, confirmation_code):
-        token = str(AccessToken.for_user(user))
+        token = str(access_token_for_user(user))
         return Response({"token": token}, status=status.HTTP_200_OK)
     raise serializers.ValidationError("Введен неверный код.")
 
 
-class CategoryViewSet(mixins.CreateModelMixin,
+@api_view(["GET"])
+@permission_classes([AllowAny])
+def autocomplete(request):
+    """Подсказки по началу названий произведений, жанров и категорий."""
+    serializer = AutocompleteSerializer(data=request.query_params)
+    serializer.is_valid(raise_exception=True)
+    return Response(
+        autocomplete_index.search(
+            serializer.validated_data["q"], serializer.validated_data["limit"]
+        ),
+        status=status.HTTP_200_OK
+    )
+
+
+class CategoryViewSet(CachedListMixin,
+                      mixins.CreateModelMixin,
                       mixins.DestroyModelMixin,
                       mixins.ListModelMixin,
                       GenericViewSet):
     """Вьюсет для просмотра, создания, удаления категории."""
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
+    cache_models = (Category,)
     permission_classes = (IsAdminOrReadOnly,)
     filter_backends = (filters.SearchFilter,)
     search_fields = ('name',)
     lookup_field = 'slug'
 
 
-class GenreViewSet(mixins.CreateModelMixin,
+class GenreViewSet(CachedListMixin,
+                   mixins.CreateModelMixin,
                    mixins.DestroyModelMixin,
                    mixins.ListModelMixin,
                    GenericViewSet):
     """Вьюсет для просмотра жанров."""
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
+    cache_models = (Genre,)
     permission_classes = (IsAdminOrReadOnly,)
     filter_backends = (filters.SearchFilter,)
     search_fields = ('name',)
     lookup_field = 'slug'
 
 
-class TitleViewSet(ModelViewSet):
+class TitleViewSet(CachedListMixin, CachedRetrieveMixin,
+                   CursorPaginationMixin, SparseFieldsMixin, ModelViewSet):
     """Вьюсет для просмотра, создания, удаления произведения."""
-    queryset = Title.objects.annotate(
-        rating=Avg('reviews__score')).order_by('-id')
+    # Жанры в порядке добавления к произведению, как в TitleListSerializer.
+    queryset = Title.objects.select_related('category').prefetch_related(
+        Prefetch('genre', queryset=Genre.objects.order_by('genretitle__id'))
+    ).order_by('-id')
+    cursor_pagination_class = TitleCursorPagination
+    # Результаты поиска сортируются по релевантности.
+    cursor_excluded_params = ('search',)
+    cache_models = (Title, GenreTitle, Review, Category, Genre)
     title_get_serializer_class = TitleGetSerializer
     title_serializer_class = TitleSerializer
     permission_classes = (IsAdminOrReadOnly,)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = TitleFilter
     http_method_names = ['get', 'post', 'patch', 'delete']
+    sparse_fields_actions = ('list', 'retrieve', 'top')
+
+    def get_cache_versions(self):
+        """Страница произведения зависит от его версии, которую меняют
+        правки, жанры и отзывы, и от названий категорий и жанров."""
+        versions = super().get_cache_versions()
+        if self.action != 'retrieve':
+            return versions
+        try:
+            version = get_object_version(
+                Title.objects, self.kwargs[self.lookup_field], versions
+            )
+        except (TypeError, ValueError):
+            return None
+        if version is None:
+            return None
+        model_versions = dict(zip(self.cache_models, versions))
+        return (version, model_versions[Category], model_versions[Genre])
+
+    def paginate_queryset(self, queryset):
+        if self.action == 'list':
+            queryset = TitleListSerializer.values(
+                queryset, self.get_sparse_fields()
+            )
+        return super().paginate_queryset(queryset)
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        if 'facets' in self.request.query_params:
+            response.data['facets'] = get_title_facets(
+                self.filter_queryset(self.get_queryset()),
+                parse_facets(self.request.query_params['facets']),
+                filtered=any(
+                    self.request.query_params.get(name)
+                    for name in self.filterset_class.base_filters
+                )
+            )
+        return response
 
     def get_serializer_class(self):
-        if self.action in ('list', 'retrieve'):
+        if self.action in ('list', 'retrieve', 'top'):
             return self.title_get_serializer_class
         return self.title_serializer_class
 
+    @action(methods=('post',), detail=False, url_path='bulk')
+    def bulk(self, request):
+        """Пакетное создание и изменение произведений.
+
+        Элементы с `id` обновляют существующие произведения, остальные
+        создаются. Пакет сохраняется целиком или не сохраняется вовсе.
+        """
+        serializer = TitleBulkSerializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(
+        methods=('get',), detail=False, permission_classes=(IsAdmin,),
+        url_path=r'export/(?P<export_format>ndjson|csv)'
+    )
+    def export(self, request, export_format):
+        """Потоковая выгрузка всего каталога в NDJSON или CSV.
+
+        Поддерживает те же фильтры, что и список произведений.
+        """
+        export, content_type = EXPORT_FORMATS[export_format]
+        queryset = self.filter_queryset(self.get_queryset()).order_by('id')
+        response = StreamingHttpResponse(
+            export(queryset, settings.TITLES_EXPORT_CHUNK_SIZE),
+            content_type=content_type
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="titles.{export_format}"'
+        )
+        return response
+
+    @action(methods=('get',), detail=False, url_path='top')
+    def top(self, request):
+        """Произведения с наибольшим рейтингом в категории и жанре."""
+        return self.cached_response(self.get_top_response, request)
+
+    def get_top_response(self, request):
+        params = TopTitlesSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        queryset = self.get_queryset()
+        if 'genre' in params.validated_data:
+            queryset = queryset.filter(
+                genretitle__genre__slug=params.validated_data['genre'],
+                genretitle__top_rating__isnull=False
+            ).order_by('-genretitle__top_rating', '-genretitle__title')
+        else:
+            queryset = queryset.filter(
+                top_rating__isnull=False
+            ).order_by('-top_rating', '-id')
+        if 'category' in params.validated_data:
+            queryset = queryset.filter(
+                category__slug=params.validated_data['category']
+            )
+        queryset = self.project_queryset(queryset)
+        serializer = self.get_serializer(
+            queryset[:params.validated_data['limit']], many=True
+        )
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(NestedResourceMixin, CursorPaginationMixin,
+                    SparseFieldsMixin, viewsets.ModelViewSet):
     """Получение/создание/обновление/удаление
     отзыва к произведению
     """
+    queryset = Review.objects.select_related('author')
     serializer_class = ReviewSerializer
+    cursor_pagination_class = PubDateCursorPagination
     permission_classes = (IsAuthorOrAdminOrModerOnly,
                           IsAuthenticatedOrReadOnly)
-
-    def get_queryset(self):
-        return self.get_title().reviews.all()
+    parent_model = Title
+    parent_field = 'title'
+    parent_lookups = {'pk': 'title_id'}
 
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user, title=self.get_title())
+        """Создает отзыв одной вставкой без предварительных проверок.
 
-    def get_title(self):
-        if hasattr(self, 'title'):
-            return self.title
-        self.title = get_object_or_404(Title, id=self.kwargs.get('title_id'))
-        return self.title
+        Если вставка нарушила целостность, произведение и повторный отзыв
+        проверяются уже после ошибки: 404 для несуществующего
+        произведения, 400 для нарушения ограничения `unique_review`.
+        """
+        title_id = int(self.kwargs['title_id'])
+        try:
+            serializer.save(author=self.request.user, title_id=title_id)
+        except IntegrityError:
+            if not Title.objects.filter(pk=title_id).exists():
+                raise Http404('Произведение не найдено.')
+            if Review.objects.filter(
+                author=self.request.user, title_id=title_id
+            ).exists():
+                raise serializers.ValidationError({
+                    api_settings.NON_FIELD_ERRORS_KEY:
+                        ['Вы уже оставили отзыв.']
+                })
+            raise
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(NestedResourceMixin, CursorPaginationMixin,
+                     SparseFieldsMixin, viewsets.ModelViewSet):
     """Получение/создание/обновление/удаление
     комментария к отзыву о произведении
     """
+    queryset = Comment.objects.select_related('author')
     serializer_class = CommentSerializer
+    cursor_pagination_class = PubDateCursorPagination
     permission_classes = (IsAuthorOrAdminOrModerOnly,
                           IsAuthenticatedOrReadOnly)
-
-    def get_queryset(self):
-        return self.get_review().comments.all()
+    parent_model = Review
+    parent_field = 'review'
+    parent_lookups = {'pk': 'review_id', 'title_id': 'title_id'}
 
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user, review=self.get_review())
-
-    def get_title(self):
-        if hasattr(self, 'title'):
-            return self.title
-        self.title = get_object_or_404(Title, id=self.kwargs.get('title_id'))
-        return self.title
-
-    def get_review(self):
-        if hasattr(self, 'review'):
-            return self.review
-        self.review = get_object_or_404(Review,
-                                        id=self.kwargs.get('review_id'),
-                                        title=self.get_title())
-        return self.review
+        serializer.save(author=self.request.user, review=self.get_parent())
@@ -35,7 +35,7 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.CachedJWTAuthentication',
     ],
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
@@ -94,6 +94,57 @@ DATABASES = {
 }
 
 
+# Cache
+# Версии моделей в кеше сообщают всем процессам о записи в базу данных,
+# поэтому кеш должен быть общим для процессов: файловый кеш подходит
+# без отдельного сервера. Локальная память процесса
+# (django.core.cache.backends.locmem.LocMemCache) допустима только при
+# запуске в одном процессе: иначе другие процессы отдают устаревшие ответы
+# до API_RESPONSE_CACHE_TIMEOUT, а снимки таблиц и индекс подсказок не
+# видят чужих записей.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache',
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    }
+}
+
+API_RESPONSE_CACHE_TIMEOUT = 60 * 60
+
+# Минимальное количество отзывов, чтобы произведение попало в топ.
+TOP_TITLES_MIN_REVIEWS = 3
+
+# Максимальное количество произведений в одном запросе пакетной загрузки.
+TITLES_BULK_MAX_ITEMS = 10000
+
+# Максимальное количество пользователей в одном запросе пакетного создания.
+USERS_BULK_MAX_ITEMS = 10000
+
+# Количество произведений, читаемых за один запрос при выгрузке каталога.
+TITLES_EXPORT_CHUNK_SIZE = 2000
+
+# Время жизни снимка пользователя, по которому проходит аутентификация,
+# и максимальное количество снимков в памяти процесса. Снимок, прочитанный
+# до изменения пользователя, сбрасывается по времени изменения в кеше.
+AUTH_USER_CACHE_TIMEOUT = 60
+AUTH_USER_CACHE_MAX_ENTRIES = 10000
+
+# Токен доступа хранит username, роль и is_superuser пользователя, и права
+# проверяются без обращения к базе данных. Роль из токена действует не
+# дольше AUTH_TOKEN_CLAIMS_MAX_AGE секунд с момента выдачи и перестает
+# действовать при изменении пользователя; дальше пользователь читается из
+# снимка или базы. Изменение роли вступает в силу сразу, если кеш общий
+# для всех процессов (как файловый кеш в CACHES); при отдельном кеше в
+# каждом процессе другие процессы увидят его не позже чем через
+# max(AUTH_TOKEN_CLAIMS_MAX_AGE, AUTH_USER_CACHE_TIMEOUT) секунд.
+AUTH_TOKEN_ROLE_CLAIMS = False
+AUTH_TOKEN_CLAIMS_MAX_AGE = 5 * 60
+
+
 # Password validation
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -138,3 +189,14 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 DEFAULT_AUTO_FIELD = 'django.db.models.AutoField'
 
 EMAIL = 'noreply@yamdb.com'
+
+# Письма отправляются фоновым потоком пачками по EMAIL_QUEUE_BATCH_SIZE
+# через одно соединение. Неотправленное письмо повторяется до
+# EMAIL_QUEUE_MAX_RETRIES раз с паузой EMAIL_QUEUE_RETRY_DELAY секунд,
+# умноженной на номер попытки. При остановке процесса очередь
+# дописывается не дольше EMAIL_QUEUE_EXIT_TIMEOUT секунд.
+EMAIL_QUEUE_ASYNC = True
+EMAIL_QUEUE_BATCH_SIZE = 100
+EMAIL_QUEUE_MAX_RETRIES = 3
+EMAIL_QUEUE_RETRY_DELAY = 5
+EMAIL_QUEUE_EXIT_TIMEOUT = 10
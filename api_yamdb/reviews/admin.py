@@ -18,7 +18,9 @@ class UserAdmin(admin.ModelAdmin):
 
 @admin.register(Title)
 class TitleAdmin(admin.ModelAdmin):
-    list_display = ('get_genres', 'category', 'name', 'year', 'description')
+    list_display = (
+        'get_genres', 'category', 'name', 'year', 'description', 'rating'
+    )
 
     def get_genres(self, obj):
         return ', '.join([str(genre) for genre in obj.genre.all()])
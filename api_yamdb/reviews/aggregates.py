@@ -0,0 +1,163 @@
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import (Avg, Case, Count, F, FloatField, OuterRef,
+                              Subquery, Sum, When)
+from django.db.models.functions import Cast, Coalesce, NullIf
+
+from .models import Comment, GenreTitle, Review, Title, TitleFacet
+
+FACET_SOURCES = {
+    TitleFacet.GENRE: (GenreTitle, 'genre_id'),
+    TitleFacet.CATEGORY: (Title, 'category_id'),
+    TitleFacet.YEAR: (Title, 'year'),
+}
+
+_pending_facets = threading.local()
+
+
+def update_rating(title_id, score_delta, count_delta):
+    """Сдвигает сохраненные агрегаты оценок произведения одним UPDATE.
+
+    Рейтинг для топа (`top_rating`) заполняется, только если отзывов не
+    меньше TOP_TITLES_MIN_REVIEWS. Условие When видит значения до
+    обновления, поэтому порог сдвигается на `count_delta`.
+    Возвращает количество обновленных строк: 0 означает, что
+    произведения с таким id нет.
+    """
+    score_sum = F('score_sum') + score_delta
+    review_count = F('review_count') + count_delta
+    rating = Cast(score_sum, FloatField()) / NullIf(review_count, 0)
+    updated = Title.objects.filter(pk=title_id).update(
+        score_sum=score_sum,
+        review_count=review_count,
+        rating=rating,
+        version=F('version') + 1,
+        top_rating=Case(
+            When(
+                review_count__gte=(
+                    settings.TOP_TITLES_MIN_REVIEWS - count_delta
+                ),
+                then=rating
+            ),
+            default=None
+        ),
+    )
+    if updated:
+        update_genre_top_ratings(GenreTitle.objects.filter(title_id=title_id))
+    return updated
+
+
+def bump_title_versions(queryset):
+    """Увеличивает версии произведений, например при смене жанров."""
+    return queryset.update(version=F('version') + 1)
+
+
+def update_genre_top_ratings(queryset):
+    """Копирует рейтинг для топа в связи жанров с произведениями."""
+    return queryset.update(top_rating=Subquery(
+        Title.objects.filter(pk=OuterRef('title_id')).values('top_rating')
+    ))
+
+
+def recalculate_ratings(queryset=None):
+    """Пересчитывает агрегаты оценок произведений по таблице отзывов."""
+    if queryset is None:
+        queryset = Title.objects.all()
+    reviews = (
+        Review.objects.filter(title=OuterRef('pk'))
+        .order_by()
+        .values('title')
+    )
+    updated = queryset.update(
+        score_sum=Coalesce(
+            Subquery(reviews.annotate(total=Sum('score')).values('total')),
+            0
+        ),
+        review_count=Coalesce(
+            Subquery(reviews.annotate(total=Count('pk')).values('total')),
+            0
+        ),
+        rating=Subquery(reviews.annotate(avg=Avg('score')).values('avg')),
+        version=F('version') + 1,
+    )
+    queryset.update(top_rating=Case(
+        When(
+            review_count__gte=settings.TOP_TITLES_MIN_REVIEWS,
+            then=F('rating')
+        ),
+        default=None
+    ))
+    update_genre_top_ratings(
+        GenreTitle.objects.filter(title__in=queryset.values('pk'))
+    )
+    return updated
+
+
+def update_comment_count(review_id, delta):
+    """Сдвигает счетчик комментариев отзыва одним UPDATE."""
+    return Review.objects.filter(pk=review_id).update(
+        comment_count=F('comment_count') + delta
+    )
+
+
+def recalculate_comment_counts(queryset=None):
+    """Пересчитывает счетчики комментариев отзывов по таблице
+    комментариев."""
+    if queryset is None:
+        queryset = Review.objects.all()
+    comments = (
+        Comment.objects.filter(review=OuterRef('pk'))
+        .order_by()
+        .values('review')
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    return queryset.update(comment_count=Coalesce(Subquery(comments), 0))
+
+
+def refresh_facets(facet, keys=None):
+    """Пересчитывает счетчики фасета для значений `keys` (или всех)."""
+    model, field = FACET_SOURCES[facet]
+    queryset = model.objects.filter(**{f'{field}__isnull': False})
+    facets = TitleFacet.objects.filter(facet=facet)
+    if keys is not None:
+        queryset = queryset.filter(**{f'{field}__in': keys})
+        facets = facets.filter(key__in=keys)
+    counts = queryset.order_by().values_list(field).annotate(Count('pk'))
+    with transaction.atomic():
+        facets.delete()
+        TitleFacet.objects.bulk_create(
+            TitleFacet(facet=facet, key=key, count=count)
+            for key, count in counts
+        )
+
+
+def schedule_facet_refresh(facet, *keys):
+    """Откладывает пересчет счетчиков до фиксации транзакции.
+
+    Значения копятся в потоке, поэтому каскадное удаление сотен связей
+    пересчитывает каждый счетчик один раз. Пересчет читает фактические
+    данные, так что значения, оставшиеся после отката, безопасно
+    пересчитать вместе со следующей записью.
+    """
+    pending = getattr(_pending_facets, 'keys', None)
+    if pending is None:
+        pending = _pending_facets.keys = defaultdict(set)
+    pending[facet].update(key for key in keys if key is not None)
+    transaction.on_commit(flush_facets)
+
+
+def flush_facets():
+    pending = getattr(_pending_facets, 'keys', None)
+    _pending_facets.keys = None
+    for facet, keys in (pending or {}).items():
+        if keys:
+            refresh_facets(facet, keys)
+
+
+def recalculate_facets():
+    for facet in FACET_SOURCES:
+        refresh_facets(facet)
@@ -8,6 +8,7 @@ from reviews.models import (
     Category, Comment, Genre,
     GenreTitle, Review, Title, User
 )
+from reviews.search import deferred_title_search
 
 
 def read_users():
@@ -168,7 +169,8 @@ class Command(BaseCommand):
         read_users()
         read_category()
         read_genre()
-        read_titles()
+        with deferred_title_search():
+            read_titles()
         read_genre_title()
         read_review()
         read_comments()
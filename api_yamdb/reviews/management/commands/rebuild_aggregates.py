@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from reviews.aggregates import (recalculate_comment_counts,
+                                recalculate_facets, recalculate_ratings)
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает сохраненные рейтинги, счетчики отзывов, '
+        'комментариев и фасетов.'
+    )
+
+    def handle(self, *args, **options):
+        updated = recalculate_ratings()
+        self.stdout.write(f'Рейтинги пересчитаны: {updated} произведений')
+        updated = recalculate_comment_counts()
+        self.stdout.write(
+            f'Счетчики комментариев пересчитаны: {updated} отзывов'
+        )
+        recalculate_facets()
+        self.stdout.write('Счетчики фасетов пересчитаны')
@@ -0,0 +1,24 @@
+from django.db import migrations
+
+from reviews.search import (install_title_search, rebuild_title_search,
+                            uninstall_title_search)
+
+
+def create_title_search(apps, schema_editor):
+    install_title_search(schema_editor.connection)
+    rebuild_title_search(schema_editor.connection)
+
+
+def drop_title_search(apps, schema_editor):
+    uninstall_title_search(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0003_pub_date_cursor_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_title_search, drop_title_search),
+    ]
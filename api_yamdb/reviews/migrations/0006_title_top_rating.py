@@ -0,0 +1,53 @@
+# Generated by Django 3.2 on 2026-10-18 18:22
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Case, F, OuterRef, Subquery, When
+
+
+def fill_top_ratings(apps, schema_editor):
+    Title = apps.get_model('reviews', 'Title')
+    GenreTitle = apps.get_model('reviews', 'GenreTitle')
+    Title.objects.update(top_rating=Case(
+        When(
+            review_count__gte=settings.TOP_TITLES_MIN_REVIEWS,
+            then=F('rating')
+        ),
+        default=None
+    ))
+    GenreTitle.objects.update(top_rating=Subquery(
+        Title.objects.filter(pk=OuterRef('title_id')).values('top_rating')
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0005_title_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='genretitle',
+            name='top_rating',
+            field=models.FloatField(blank=True, editable=False, null=True, verbose_name='Рейтинг произведения в топе'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='top_rating',
+            field=models.FloatField(blank=True, editable=False, null=True, verbose_name='Рейтинг в топе'),
+        ),
+        migrations.AddIndex(
+            model_name='genretitle',
+            index=models.Index(fields=['genre', '-top_rating', '-title'], name='genretitle_genre_top_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['-top_rating', '-id'], name='title_top_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['category', '-top_rating', '-id'], name='title_category_top_idx'),
+        ),
+        migrations.RunPython(fill_top_ratings, migrations.RunPython.noop),
+    ]
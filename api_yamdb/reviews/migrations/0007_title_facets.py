@@ -0,0 +1,54 @@
+# Generated by Django 3.2 on 2026-10-18 18:23
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_title_facets(apps, schema_editor):
+    Title = apps.get_model('reviews', 'Title')
+    GenreTitle = apps.get_model('reviews', 'GenreTitle')
+    TitleFacet = apps.get_model('reviews', 'TitleFacet')
+    sources = (
+        ('genre', GenreTitle, 'genre_id'),
+        ('category', Title, 'category_id'),
+        ('year', Title, 'year'),
+    )
+    for facet, model, field in sources:
+        counts = (
+            model.objects.filter(**{f'{field}__isnull': False})
+            .order_by()
+            .values_list(field)
+            .annotate(Count('pk'))
+        )
+        TitleFacet.objects.bulk_create(
+            TitleFacet(facet=facet, key=key, count=count)
+            for key, count in counts
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0006_title_top_rating'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TitleFacet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('facet', models.CharField(choices=[('genre', 'Жанр'), ('category', 'Категория'), ('year', 'Год выпуска')], max_length=16, verbose_name='Фасет')),
+                ('key', models.IntegerField(verbose_name='Значение')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Количество произведений')),
+            ],
+            options={
+                'verbose_name': 'Счетчик фасета',
+                'verbose_name_plural': 'Счетчики фасетов',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='titlefacet',
+            constraint=models.UniqueConstraint(fields=('facet', 'key'), name='unique_title_facet'),
+        ),
+        migrations.RunPython(fill_title_facets, migrations.RunPython.noop),
+    ]
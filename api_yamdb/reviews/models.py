@@ -1,6 +1,6 @@
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import models, transaction
 
 from .validators import validate_username, validate_year
 
@@ -101,6 +101,86 @@ class Title(models.Model):
         blank=True,
         verbose_name='Описание'
     )
+    score_sum = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Сумма оценок'
+    )
+    review_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество отзывов'
+    )
+    rating = models.FloatField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name='Рейтинг'
+    )
+    top_rating = models.FloatField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name='Рейтинг в топе'
+    )
+    # Увеличивается при каждом изменении произведения, его жанров или
+    # рейтинга; из нее строится ETag страницы произведения.
+    version = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Версия'
+    )
+
+    AGGREGATE_FIELDS = ('score_sum', 'review_count', 'rating', 'top_rating')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['year'], name='title_year_idx'),
+            models.Index(
+                fields=['category', 'year'], name='title_category_year_idx'
+            ),
+            models.Index(
+                fields=['-top_rating', '-id'], name='title_top_idx'
+            ),
+            models.Index(
+                fields=['category', '-top_rating', '-id'],
+                name='title_category_top_idx'
+            ),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_facet_state()
+        return instance
+
+    def remember_facet_state(self):
+        """Запоминает категорию и год, уже учтенные в счетчиках фасетов."""
+        self._facet_state = (
+            self.__dict__.get('category_id'), self.__dict__.get('year')
+        )
+
+    def save(self, *args, **kwargs):
+        if (not self._state.adding and not kwargs.get('force_insert')
+                and kwargs.get('update_fields') is None):
+            # Счетчики рейтинга меняет update_rating запросами к базе:
+            # значения, загруженные вместе с объектом, могли устареть.
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.AGGREGATE_FIELDS
+            ]
+        update_fields = kwargs.get('update_fields')
+        bump_version = not self._state.adding and (
+            update_fields is None or 'version' in update_fields
+        )
+        if bump_version:
+            # Версия увеличивается в базе, чтобы не затереть увеличения,
+            # сделанные update_rating после загрузки объекта.
+            self.version = models.F('version') + 1
+        super().save(*args, **kwargs)
+        if bump_version:
+            self.refresh_from_db(fields=('version',))
 
     def __str__(self):
         return self.name
@@ -111,12 +191,75 @@ class GenreTitle(models.Model):
     genre = models.ForeignKey(
         Genre,
         on_delete=models.CASCADE,
+        db_index=False
     )
     title = models.ForeignKey(
         Title,
-        on_delete=models.CASCADE
+        on_delete=models.CASCADE,
+        db_index=False
+    )
+    top_rating = models.FloatField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name='Рейтинг произведения в топе'
     )
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['title', 'genre'],
+                name='unique_genre_title'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['genre', 'title'], name='genretitle_genre_title_idx'
+            ),
+            models.Index(
+                fields=['genre', '-top_rating', '-title'],
+                name='genretitle_genre_top_idx'
+            ),
+        ]
+
+
+class TitleFacet(models.Model):
+    """Количество произведений по значению фильтра (жанр, категория, год)."""
+    GENRE = 'genre'
+    CATEGORY = 'category'
+    YEAR = 'year'
+    FACETS = [
+        (GENRE, 'Жанр'),
+        (CATEGORY, 'Категория'),
+        (YEAR, 'Год выпуска'),
+    ]
+
+    facet = models.CharField(
+        choices=FACETS,
+        max_length=16,
+        verbose_name='Фасет'
+    )
+    key = models.IntegerField(
+        verbose_name='Значение'
+    )
+    count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество произведений'
+    )
+
+    class Meta:
+        verbose_name = 'Счетчик фасета'
+        verbose_name_plural = 'Счетчики фасетов'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['facet', 'key'],
+                name='unique_title_facet'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.facet}={self.key}: {self.count}'
+
 
 class Review(models.Model):
     author = models.ForeignKey(
@@ -145,6 +288,11 @@ class Review(models.Model):
             MaxValueValidator(10, 'Разрешены значения от 1 до 10')
         ]
     )
+    comment_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество комментариев'
+    )
 
     class Meta:
         verbose_name = 'Отзыв'
@@ -156,6 +304,40 @@ class Review(models.Model):
                 name='unique_review'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['title', '-pub_date', '-id'],
+                name='review_title_pub_date_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='review_author_pub_date_idx'
+            ),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_rating_state()
+        return instance
+
+    def remember_rating_state(self):
+        """Запоминает оценку, уже учтенную в рейтинге произведения."""
+        self._rating_state = (
+            self.__dict__.get('title_id'), self.__dict__.get('score')
+        )
+
+    def save(self, *args, **kwargs):
+        if (not self._state.adding and not kwargs.get('force_insert')
+                and kwargs.get('update_fields') is None):
+            # comment_count меняет update_comment_count запросом к базе:
+            # значение, загруженное вместе с отзывом, могло устареть.
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'comment_count'
+            ]
+        with transaction.atomic(savepoint=False):
+            super().save(*args, **kwargs)
 
     def __str__(self):
         return self.text[:500]
@@ -186,6 +368,26 @@ class Comment(models.Model):
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(
+                fields=['review', '-pub_date', '-id'],
+                name='comment_review_pub_date_idx'
+            )
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_counted_review()
+        return instance
+
+    def remember_counted_review(self):
+        """Запоминает отзыв, в счетчике которого учтен комментарий."""
+        self._counted_review_id = self.__dict__.get('review_id')
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic(savepoint=False):
+            super().save(*args, **kwargs)
 
     def __str__(self):
         return self.text[:500]
@@ -0,0 +1,133 @@
+import re
+from contextlib import contextmanager
+
+from django.db import connections
+from django.db.models import Q
+
+TITLE_SEARCH_TABLE = 'reviews_title_fts'
+TITLE_SEARCH_TRIGGERS = {
+    'reviews_title_fts_insert': (
+        'AFTER INSERT ON reviews_title BEGIN '
+        'INSERT INTO reviews_title_fts(rowid, name, description) '
+        'VALUES (new.id, new.name, new.description); END'
+    ),
+    'reviews_title_fts_delete': (
+        'AFTER DELETE ON reviews_title BEGIN '
+        'INSERT INTO reviews_title_fts'
+        '(reviews_title_fts, rowid, name, description) '
+        "VALUES ('delete', old.id, old.name, old.description); END"
+    ),
+    'reviews_title_fts_update': (
+        'AFTER UPDATE OF name, description ON reviews_title BEGIN '
+        'INSERT INTO reviews_title_fts'
+        '(reviews_title_fts, rowid, name, description) '
+        "VALUES ('delete', old.id, old.name, old.description); "
+        'INSERT INTO reviews_title_fts(rowid, name, description) '
+        'VALUES (new.id, new.name, new.description); END'
+    ),
+}
+REGEX_SEARCH_TOKEN = re.compile(r'\w+')
+
+
+def supports_title_search(connection):
+    return connection.vendor == 'sqlite'
+
+
+def install_title_search(connection):
+    """Создает FTS5-индекс произведений и триггеры синхронизации.
+
+    Вызывается повторно после миграций: SQLite пересоздает таблицу
+    при изменении схемы, и триггеры при этом пропадают.
+    """
+    if not supports_title_search(connection):
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {TITLE_SEARCH_TABLE} '
+            'USING fts5(name, description, content=reviews_title, '
+            "content_rowid=id, tokenize='unicode61 remove_diacritics 2')"
+        )
+        cursor.execute(
+            f'INSERT INTO {TITLE_SEARCH_TABLE}({TITLE_SEARCH_TABLE}, rank) '
+            "VALUES ('rank', 'bm25(10.0, 1.0)')"
+        )
+        for name, body in TITLE_SEARCH_TRIGGERS.items():
+            cursor.execute(f'CREATE TRIGGER IF NOT EXISTS {name} {body}')
+
+
+def restore_title_search(connection):
+    """Возвращает триггеры, если индекс уже создан миграцией."""
+    if (
+        supports_title_search(connection)
+        and TITLE_SEARCH_TABLE in connection.introspection.table_names()
+    ):
+        install_title_search(connection)
+
+
+def uninstall_title_search(connection):
+    if not supports_title_search(connection):
+        return
+    with connection.cursor() as cursor:
+        for name in TITLE_SEARCH_TRIGGERS:
+            cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+        cursor.execute(f'DROP TABLE IF EXISTS {TITLE_SEARCH_TABLE}')
+
+
+def rebuild_title_search(connection):
+    """Заново строит индекс по всей таблице произведений."""
+    if not supports_title_search(connection):
+        return
+    with connection.cursor() as cursor:
+        for command in ('rebuild', 'optimize'):
+            cursor.execute(
+                f'INSERT INTO {TITLE_SEARCH_TABLE}({TITLE_SEARCH_TABLE}) '
+                'VALUES (%s)', [command]
+            )
+
+
+@contextmanager
+def deferred_title_search(using='default'):
+    """Отключает построчную синхронизацию индекса на время массовой
+    загрузки и строит индекс целиком по ее завершении."""
+    connection = connections[using]
+    if not supports_title_search(connection):
+        yield
+        return
+    with connection.cursor() as cursor:
+        for name in TITLE_SEARCH_TRIGGERS:
+            cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+    try:
+        yield
+    finally:
+        install_title_search(connection)
+        rebuild_title_search(connection)
+
+
+def build_match_expression(query):
+    """Превращает пользовательский ввод в запрос FTS5 по префиксам слов."""
+    return ' '.join(
+        f'"{token}"*' for token in REGEX_SEARCH_TOKEN.findall(query)
+    )
+
+
+def search_titles(queryset, query):
+    """Фильтрует произведения по запросу и сортирует по релевантности."""
+    expression = build_match_expression(query)
+    if not expression:
+        return queryset.none()
+    if not supports_title_search(connections[queryset.db]):
+        return queryset.filter(
+            Q(name__icontains=query) | Q(description__icontains=query)
+        )
+    # Унарный плюс не дает планировщику использовать rowid индекса как
+    # условие внутреннего цикла: поиск по индексу выполняется один раз во
+    # внешнем цикле, а не заново для каждой строки других фильтров.
+    return queryset.extra(
+        tables=[TITLE_SEARCH_TABLE],
+        where=[
+            f'+{TITLE_SEARCH_TABLE}.rowid = reviews_title.id',
+            f'{TITLE_SEARCH_TABLE} MATCH %s',
+        ],
+        params=[expression],
+        order_by=[f'{TITLE_SEARCH_TABLE}.rank', '-id'],
+    )
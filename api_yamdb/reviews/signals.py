@@ -0,0 +1,161 @@
+from django.db import IntegrityError, connections
+from django.db.models.signals import (m2m_changed, post_delete, post_migrate,
+                                      post_save)
+from django.dispatch import Signal, receiver
+
+from .aggregates import (bump_title_versions, recalculate_comment_counts,
+                         recalculate_ratings, schedule_facet_refresh,
+                         update_comment_count, update_genre_top_ratings,
+                         update_rating)
+from .models import Category, Comment, GenreTitle, Review, Title, TitleFacet
+from .search import restore_title_search
+
+# Отправляется после пакетной записи произведений через bulk_create и
+# bulk_update, которые не вызывают post_save и m2m_changed. Аргументы:
+# titles - сохраненные произведения, genre_ids - жанры, связи с которыми
+# были добавлены или удалены.
+titles_bulk_saved = Signal()
+
+
+@receiver(post_save, sender=Review)
+def review_saved(sender, instance, created, **kwargs):
+    """Учитывает новую или измененную оценку в рейтинге произведения."""
+    state = getattr(instance, '_rating_state', None)
+    if created:
+        if not update_rating(instance.title_id, instance.score, 1):
+            # Внешний ключ проверяется только при фиксации транзакции:
+            # отзыв к несуществующему произведению откатывается здесь.
+            raise IntegrityError('Произведение отзыва не найдено.')
+    elif state is None or None in state:
+        recalculate_ratings(Title.objects.filter(pk=instance.title_id))
+    else:
+        old_title_id, old_score = state
+        if old_title_id != instance.title_id:
+            update_rating(old_title_id, -old_score, -1)
+            update_rating(instance.title_id, instance.score, 1)
+        elif old_score != instance.score:
+            update_rating(instance.title_id, instance.score - old_score, 0)
+    instance.remember_rating_state()
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted(sender, instance, **kwargs):
+    """Убирает оценку удаленного отзыва из рейтинга произведения."""
+    title_id, score = getattr(
+        instance, '_rating_state', (instance.title_id, instance.score)
+    )
+    if score is None:
+        recalculate_ratings(Title.objects.filter(pk=title_id))
+    else:
+        update_rating(title_id, -score, -1)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    """Учитывает новый или перенесенный комментарий в счетчике отзыва."""
+    old_review_id = getattr(instance, '_counted_review_id', None)
+    if created:
+        update_comment_count(instance.review_id, 1)
+    elif old_review_id is None:
+        recalculate_comment_counts(
+            Review.objects.filter(pk=instance.review_id)
+        )
+    elif old_review_id != instance.review_id:
+        update_comment_count(old_review_id, -1)
+        update_comment_count(instance.review_id, 1)
+    instance.remember_counted_review()
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    """Срабатывает и при каскадном удалении вместе с отзывом: комментарии
+    удаляются раньше отзыва, поэтому UPDATE выполняется для каждого
+    удаленного комментария над строкой, которая затем удаляется."""
+    update_comment_count(
+        getattr(instance, '_counted_review_id', None) or instance.review_id,
+        -1
+    )
+
+
+@receiver(post_save, sender=Title)
+def title_saved(sender, instance, created, **kwargs):
+    """Обновляет счетчики фасетов по категории и году произведения."""
+    old_category_id, old_year = getattr(
+        instance, '_facet_state', (None, None)
+    )
+    if created or old_category_id != instance.category_id:
+        schedule_facet_refresh(
+            TitleFacet.CATEGORY, old_category_id, instance.category_id
+        )
+    if created or old_year != instance.year:
+        schedule_facet_refresh(TitleFacet.YEAR, old_year, instance.year)
+    instance.remember_facet_state()
+
+
+@receiver(post_delete, sender=Title)
+def title_deleted(sender, instance, **kwargs):
+    schedule_facet_refresh(TitleFacet.CATEGORY, instance.category_id)
+    schedule_facet_refresh(TitleFacet.YEAR, instance.year)
+
+
+@receiver(titles_bulk_saved, sender=Title)
+def titles_bulk_saved_facets(sender, titles, genre_ids, **kwargs):
+    """Обновляет счетчики фасетов после пакетной записи произведений."""
+    categories, years = set(), set()
+    for title in titles:
+        old_category_id, old_year = getattr(
+            title, '_facet_state', (None, None)
+        )
+        categories.update((old_category_id, title.category_id))
+        years.update((old_year, title.year))
+        title.remember_facet_state()
+    schedule_facet_refresh(TitleFacet.CATEGORY, *categories)
+    schedule_facet_refresh(TitleFacet.YEAR, *years)
+    schedule_facet_refresh(TitleFacet.GENRE, *genre_ids)
+
+
+@receiver(post_delete, sender=Category)
+def category_deleted(sender, instance, **kwargs):
+    schedule_facet_refresh(TitleFacet.CATEGORY, instance.pk)
+
+
+@receiver(post_save, sender=GenreTitle)
+def genre_title_saved(sender, instance, created, **kwargs):
+    """Связь, созданная напрямую, минуя менеджер `Title.genre`."""
+    if created:
+        schedule_facet_refresh(TitleFacet.GENRE, instance.genre_id)
+        update_genre_top_ratings(GenreTitle.objects.filter(pk=instance.pk))
+        bump_title_versions(Title.objects.filter(pk=instance.title_id))
+
+
+@receiver(post_delete, sender=GenreTitle)
+def genre_title_deleted(sender, instance, **kwargs):
+    """Связи удаляются по одной и при remove()/clear(), и каскадом."""
+    schedule_facet_refresh(TitleFacet.GENRE, instance.genre_id)
+    bump_title_versions(Title.objects.filter(pk=instance.title_id))
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def title_genres_added(sender, instance, action, reverse, pk_set, **kwargs):
+    """Обновляет фасеты жанров и переносит рейтинг для топа в новые
+    связи жанров с произведением."""
+    if action != 'post_add':
+        return
+    if reverse:
+        schedule_facet_refresh(TitleFacet.GENRE, instance.pk)
+        update_genre_top_ratings(GenreTitle.objects.filter(
+            genre=instance, title_id__in=pk_set
+        ))
+        bump_title_versions(Title.objects.filter(pk__in=pk_set))
+        return
+    schedule_facet_refresh(TitleFacet.GENRE, *pk_set)
+    bump_title_versions(Title.objects.filter(pk=instance.pk))
+    if instance.top_rating is not None:
+        update_genre_top_ratings(GenreTitle.objects.filter(title=instance))
+
+
+@receiver(post_migrate)
+def title_search_migrated(sender, using, **kwargs):
+    """Восстанавливает триггеры поиска после пересоздания таблицы."""
+    if sender.name == 'reviews':
+        restore_title_search(connections[using])
@@ -4,11 +4,13 @@ import re
 from django.core.exceptions import ValidationError
 
 REGEX_USERNAME = re.compile(r'^[\w.@+-]+')
+# Имена, совпадающие с адресами эндпоинтов /users/me/ и /users/bulk/.
+RESERVED_USERNAMES = ('me', 'bulk')
 
 
 def validate_username(value):
-    if value == 'me':
-        raise ValidationError('Использовать имя "me" запрещено!')
+    if value in RESERVED_USERNAMES:
+        raise ValidationError(f'Использовать имя "{value}" запрещено!')
     if not REGEX_USERNAME.fullmatch(value):
         raise ValidationError(
             'Можно использовать только буквы, цифры и символы @.+-_".')
@@ -0,0 +1,91 @@
+"""Замер фильтров TitleFilter на сгенерированном каталоге.
+
+Для каждой комбинации фильтров печатает время запроса страницы и
+подсчета количества, а также EXPLAIN QUERY PLAN. Строки плана со
+сканированием таблицы (SCAN без индекса) отмечаются знаком `!`.
+"""
+import argparse
+import itertools
+import random
+
+from utils import batched, measure, setup_database
+
+FILTER_VALUES = {
+    'genre': 'genre-7',
+    'category': 'category-3',
+    'year': 1999,
+    'search': 'слово',
+    'name': 'слово',
+}
+
+
+def generate_catalog(titles_count, genres_count=30, categories_count=10):
+    from reviews.models import Category, Genre, GenreTitle, Title
+    from reviews.search import deferred_title_search
+
+    random.seed(0)
+    Category.objects.bulk_create(
+        Category(id=idx, name=f'Категория {idx}', slug=f'category-{idx}')
+        for idx in range(1, categories_count + 1)
+    )
+    Genre.objects.bulk_create(
+        Genre(id=idx, name=f'Жанр {idx}', slug=f'genre-{idx}')
+        for idx in range(1, genres_count + 1)
+    )
+    words = ['слово', 'фильм', 'книга', 'песня', 'история', 'дорога']
+    ids = list(range(1, titles_count + 1))
+    with deferred_title_search():
+        for chunk in batched(ids, 5000):
+            Title.objects.bulk_create(
+                Title(
+                    id=idx,
+                    name=' '.join(random.sample(words, 2)) + f' {idx}',
+                    year=random.randint(1950, 2020),
+                    category_id=random.randint(1, categories_count),
+                    description=' '.join(random.choices(words, k=8)),
+                )
+                for idx in chunk
+            )
+            GenreTitle.objects.bulk_create(
+                GenreTitle(title_id=idx, genre_id=genre_id)
+                for idx in chunk
+                for genre_id in random.sample(
+                    range(1, genres_count + 1), random.randint(1, 3)
+                )
+            )
+
+
+def filter_combinations():
+    names = list(FILTER_VALUES)
+    for size in range(1, len(names) + 1):
+        for combination in itertools.combinations(names, size):
+            yield {name: FILTER_VALUES[name] for name in combination}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--titles', type=int, default=100_000)
+    args = parser.parse_args()
+
+    setup_database()
+    from api.filters import TitleFilter
+    from api.views import TitleViewSet
+
+    generate_catalog(args.titles)
+    print(f'Произведений: {args.titles}\n')
+    for params in filter_combinations():
+        queryset = TitleFilter(
+            params, queryset=TitleViewSet.queryset.all()
+        ).qs
+        page = queryset[:10]
+        page_ms = measure(lambda: list(page.all()))
+        count_ms = measure(lambda: queryset.count())
+        print(f'{params}: страница {page_ms:.2f} мс, '
+              f'count {count_ms:.2f} мс')
+        for line in page.explain().splitlines():
+            scan = 'SCAN' in line and 'VIRTUAL TABLE' not in line
+            print(f'  {"!" if scan else " "} {line}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""Замер сериализации страницы списка произведений.
+
+Сравнивает TitleGetSerializer по объектам модели (select_related и
+prefetch_related) с быстрым путем TitleListSerializer по строкам
+`.values()`. Перед замером проверяет, что оба способа дают одинаковый
+JSON.
+"""
+import argparse
+
+from title_filters import generate_catalog
+from utils import measure, setup_database
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--titles', type=int, default=10_000)
+    parser.add_argument('--page', type=int, default=1000)
+    args = parser.parse_args()
+
+    setup_database()
+    from rest_framework.renderers import JSONRenderer
+
+    from api.serializers import TitleGetSerializer, TitleListSerializer
+    from api.views import TitleViewSet
+
+    generate_catalog(args.titles)
+    queryset = TitleViewSet.queryset.all()
+
+    def render_models():
+        page = list(queryset[:args.page])
+        return JSONRenderer().render(
+            TitleGetSerializer(page, many=True).data
+        )
+
+    def render_values():
+        page = list(TitleListSerializer.values(queryset)[:args.page])
+        return JSONRenderer().render(
+            TitleGetSerializer(page, many=True).data
+        )
+
+    assert render_models() == render_values(), (
+        'Ответы сериализаторов различаются'
+    )
+    models_ms = measure(render_models)
+    values_ms = measure(render_values)
+    print(f'Произведений: {args.titles}, на странице: {args.page}')
+    print(f'Объекты модели: {models_ms:.1f} мс')
+    print(f'Строки values(): {values_ms:.1f} мс '
+          f'(в {models_ms / values_ms:.1f} раза быстрее)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""Замер поиска пользователей на сгенерированной таблице.
+
+Сравнивает поиск по подстроке (`search`, как в SearchFilter) и по
+началу строки через LIKE с фильтрами UserFilter, которые читают
+индексы username и email. Для каждого способа печатает время запроса
+страницы и EXPLAIN QUERY PLAN; строки плана со сканированием таблицы
+отмечаются знаком `!`.
+"""
+import argparse
+
+from utils import batched, measure, setup_database
+
+
+def generate_users(users_count):
+    from reviews.models import User
+
+    for chunk in batched(range(1, users_count + 1), 10_000):
+        User.objects.bulk_create(
+            User(
+                id=idx,
+                username=f'user{idx:07d}',
+                email=f'mail{idx:07d}@yamdb.fake',
+                password='',
+            )
+            for idx in chunk
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    setup_database()
+    from api.filters import UserFilter
+    from reviews.models import User
+
+    generate_users(args.users)
+    print(f'Пользователей: {args.users}\n')
+    middle = args.users // 2
+    username = f'user{middle:07d}'
+    email = f'mail{middle:07d}@yamdb.fake'
+    querysets = {
+        f'username__icontains={username}':
+            User.objects.filter(username__icontains=username),
+        f'username__istartswith={username[:-2]}':
+            User.objects.filter(username__istartswith=username[:-2]),
+        f'username={username}':
+            UserFilter({'username': username}).qs,
+        f'username_prefix={username[:-2]}':
+            UserFilter({'username_prefix': username[:-2]}).qs,
+        f'email__icontains={email}':
+            User.objects.filter(email__icontains=email),
+        f'email={email}':
+            UserFilter({'email': email}).qs,
+        f'email_prefix={email[:-12]}':
+            UserFilter({'email_prefix': email[:-12]}).qs,
+    }
+    for params, queryset in querysets.items():
+        page = queryset.order_by('id')[:10]
+        page_ms = measure(lambda: list(page.all()))
+        print(f'{params}: страница {page_ms:.2f} мс')
+        for line in page.explain().splitlines():
+            print(f'  {"!" if "SCAN" in line else " "} {line}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+"""Общие функции для запуска замеров на временной базе данных.
+
+Скрипты запускаются из корня репозитория, например:
+    python benchmarks/title_filters.py --titles 100000
+"""
+import os
+import sys
+import time
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent / 'api_yamdb'
+sys.path.insert(0, str(PROJECT_DIR))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_yamdb.settings')
+
+
+def setup_database():
+    """Настраивает Django и создает тестовую базу с миграциями."""
+    import django
+    django.setup()
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0)
+
+
+def measure(func, repeat=5):
+    """Возвращает минимальное время выполнения функции в миллисекундах."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def batched(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
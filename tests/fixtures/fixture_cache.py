@@ -0,0 +1,13 @@
+import pytest
+from django.core.cache import cache
+
+from api.authentication import user_snapshots
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    user_snapshots.clear()
+    yield
+    cache.clear()
+    user_snapshots.clear()
@@ -0,0 +1,8 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def sync_mail(settings):
+    """Письма отправляются в потоке запроса, чтобы mail.outbox был
+    заполнен к моменту ответа."""
+    settings.EMAIL_QUEUE_ASYNC = False
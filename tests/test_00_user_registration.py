@@ -2,8 +2,11 @@ from http import HTTPStatus
 
 import pytest
 from django.core import mail
+from django.core.mail.backends import locmem
 from django.db.utils import IntegrityError
 
+from api.mail import mail_queue
+
 from tests.utils import (invalid_data_for_user_patch_and_creation,
                          invalid_data_for_username_and_email_fields)
 
@@ -373,3 +376,55 @@ class Test00UserRegistration:
             'пользователя, созданного администратором,  возвращает ответ '
             'со статусом 200.'
         )
+
+    def test_signup_mail_queue(self, client, settings, tmp_path):
+        settings.EMAIL_QUEUE_ASYNC = True
+        settings.EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+        settings.EMAIL_FILE_PATH = str(tmp_path)
+        valid_data = {
+            'email': 'queued@yamdb.fake',
+            'username': 'queued_username'
+        }
+        response = client.post(self.url_signup, data=valid_data)
+        assert response.status_code == HTTPStatus.OK, (
+            'POST-запрос с корректными данными, отправленный на эндпоинт '
+            f'`{self.url_signup}`, должен вернуть ответ со статусом 200.'
+        )
+        assert mail_queue.join(timeout=5), (
+            'Проверьте, что письма из очереди отправляются фоновым потоком.'
+        )
+        sent = ''.join(path.read_text() for path in tmp_path.iterdir())
+        assert valid_data['email'] in sent and 'Ваш код подтверждения' in sent, (
+            'Проверьте, что письмо с кодом подтверждения, поставленное в '
+            'очередь, отправляется на `email`, указанный в запросе.'
+        )
+
+    def test_signup_mail_queue_retry(self, client, settings, monkeypatch):
+        settings.EMAIL_QUEUE_ASYNC = True
+        settings.EMAIL_QUEUE_RETRY_DELAY = 0
+        send_messages = locmem.EmailBackend.send_messages
+        attempts = []
+
+        def flaky_send_messages(backend, messages):
+            attempts.append(messages)
+            if len(attempts) == 1:
+                raise ConnectionError('Сервер недоступен')
+            return send_messages(backend, messages)
+
+        monkeypatch.setattr(
+            locmem.EmailBackend, 'send_messages', flaky_send_messages
+        )
+        outbox_before_count = len(mail.outbox)
+        client.post(self.url_signup, data={
+            'email': 'retry@yamdb.fake',
+            'username': 'retry_username'
+        })
+        assert mail_queue.join(timeout=5), (
+            'Проверьте, что письма из очереди отправляются фоновым потоком.'
+        )
+        assert len(attempts) == 2, (
+            'Проверьте, что неотправленное письмо повторно ставится в очередь.'
+        )
+        assert len(mail.outbox) == outbox_before_count + 1, (
+            'Проверьте, что письмо отправляется после неудачной попытки.'
+        )
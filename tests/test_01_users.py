@@ -1,6 +1,15 @@
+import time
 from http import HTTPStatus
 
 import pytest
+from django.core import mail
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from api.authentication import USER_CHANGED_KEY, access_token_for_user
+from api.serializers import UserBulkSerializer
 
 from tests.utils import (check_pagination,
                          invalid_data_for_user_patch_and_creation)
@@ -552,3 +561,266 @@ class Test01UserAPI:
             'Проверьте, что PATCH-запрос к `/api/v1/users/me/` с ключом '
             '`role` не изменяет роль пользователя.'
         )
+
+    def test_11_01_auth_user_snapshot_no_queries(self, user_client, user):
+        url = '/api/v1/users/me/reviews/'
+        user_client.get(url)
+        with CaptureQueriesContext(connection) as context:
+            response = user_client.get(url)
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что GET-запрос пользователя к `{url}` возвращает '
+            'ответ со статусом 200.'
+        )
+        users_table = user._meta.db_table
+        auth_queries = [
+            query for query in context.captured_queries
+            if f'FROM "{users_table}"' in query['sql']
+        ]
+        assert not auth_queries, (
+            'Проверьте, что при повторном запросе пользователь для '
+            'аутентификации берется из кеша без запросов к базе данных.'
+        )
+
+        response = user_client.get('/api/v1/users/me/')
+        assert response.json().get('email') == user.email, (
+            'Проверьте, что `/api/v1/users/me/` возвращает все поля '
+            'пользователя, в том числе не попавшие в кеш аутентификации.'
+        )
+
+    def test_11_02_auth_user_snapshot_invalidated(self, admin_client, admin):
+        url = '/api/v1/users/'
+        response = admin_client.get(url)
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что GET-запрос администратора к `{url}` возвращает '
+            'ответ со статусом 200.'
+        )
+        admin.role = 'user'
+        admin.save()
+        response = admin_client.get(url)
+        assert response.status_code == HTTPStatus.FORBIDDEN, (
+            'Проверьте, что после смены роли пользователя закешированные '
+            'данные аутентификации сбрасываются и права проверяются по '
+            'новой роли.'
+        )
+
+        admin.is_active = False
+        admin.save()
+        response = admin_client.get('/api/v1/users/me/')
+        assert response.status_code == HTTPStatus.UNAUTHORIZED, (
+            'Проверьте, что заблокированный пользователь не проходит '
+            'аутентификацию сразу после блокировки.'
+        )
+
+    def test_11_03_auth_user_snapshot_changed_elsewhere(self, admin_client,
+                                                        admin):
+        url = '/api/v1/users/'
+        response = admin_client.get(url)
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что GET-запрос администратора к `{url}` возвращает '
+            'ответ со статусом 200.'
+        )
+        # Роль изменена в другом процессе: снимок в памяти этого процесса
+        # остается, меняется только время изменения в общем кеше.
+        type(admin).objects.filter(pk=admin.pk).update(role='user')
+        cache.set(USER_CHANGED_KEY.format(admin.pk), time.time())
+        response = admin_client.get(url)
+        assert response.status_code == HTTPStatus.FORBIDDEN, (
+            'Проверьте, что снимок пользователя, сохраненный до его '
+            'изменения в другом процессе, не используется для проверки прав.'
+        )
+
+    def test_12_01_users_bulk_create(self, admin_client, admin,
+                                     django_user_model):
+        url = '/api/v1/users/bulk/'
+        data = [
+            {'username': 'bulk_user_1', 'email': 'bulk1@yamdb.fake'},
+            {'username': admin.username, 'email': 'bulk2@yamdb.fake'},
+            {'username': 'bulk_user_3', 'email': 'bulk1@yamdb.fake'},
+            {'username': 'me', 'email': 'bulk4@yamdb.fake'},
+            {'username': 'bulk_user_5', 'email': 'bulk5@yamdb.fake',
+             'role': 'moderator', 'bio': 'bio'},
+        ]
+        outbox_before_count = len(mail.outbox)
+        response = admin_client.post(url, data=data, format='json')
+        assert response.status_code == HTTPStatus.CREATED, (
+            f'Проверьте, что POST-запрос администратора к `{url}` '
+            'возвращает ответ со статусом 201, если создан хотя бы один '
+            'пользователь.'
+        )
+        response_data = response.json()
+        assert [user['username'] for user in response_data['created']] == [
+            'bulk_user_1', 'bulk_user_5'
+        ], (
+            f'Проверьте, что POST-запрос к `{url}` создает пользователей '
+            'без ошибок и возвращает их в ключе `created`.'
+        )
+        errors = {error['index']: error['errors']
+                  for error in response_data['errors']}
+        assert set(errors) == {1, 2, 3}, (
+            f'Проверьте, что POST-запрос к `{url}` возвращает в ключе '
+            '`errors` номера элементов с ошибками и конфликтами.'
+        )
+        assert ('username' in errors[1] and 'email' in errors[2]
+                and 'username' in errors[3]), (
+            f'Проверьте, что POST-запрос к `{url}` сообщает, какое поле '
+            'элемента занято или некорректно.'
+        )
+        moderator = django_user_model.objects.get(username='bulk_user_5')
+        assert moderator.role == 'moderator' and moderator.bio == 'bio', (
+            f'Проверьте, что POST-запрос к `{url}` сохраняет переданные '
+            'поля пользователей.'
+        )
+        assert sorted(
+            message.to[0] for message in mail.outbox[outbox_before_count:]
+        ) == ['bulk1@yamdb.fake', 'bulk5@yamdb.fake'], (
+            f'Проверьте, что POST-запрос к `{url}` отправляет код '
+            'подтверждения каждому созданному пользователю.'
+        )
+
+        response = admin_client.post(url, data=data[:2], format='json')
+        assert response.status_code == HTTPStatus.BAD_REQUEST, (
+            f'Проверьте, что POST-запрос к `{url}`, в котором ни один '
+            'пользователь не создан, возвращает ответ со статусом 400.'
+        )
+
+    def test_12_02_users_bulk_create_permissions(self, client,
+                                                 moderator_client):
+        url = '/api/v1/users/bulk/'
+        data = [{'username': 'bulk_user', 'email': 'bulk@yamdb.fake'}]
+        response = client.post(url, data=data,
+                               content_type='application/json')
+        assert response.status_code == HTTPStatus.UNAUTHORIZED, (
+            f'Проверьте, что POST-запрос неавторизованного пользователя к '
+            f'`{url}` возвращает ответ со статусом 401.'
+        )
+        response = moderator_client.post(url, data=data, format='json')
+        assert response.status_code == HTTPStatus.FORBIDDEN, (
+            f'Проверьте, что POST-запрос модератора к `{url}` возвращает '
+            'ответ со статусом 403.'
+        )
+
+    def test_13_users_search_by_index(self, admin_client, django_user_model):
+        for username, email in (('alpha', 'alpha@yamdb.fake'),
+                                ('alphabet', 'letters@yamdb.fake'),
+                                ('alps', 'alps@mountains.fake'),
+                                ('Alpine', 'alpine@yamdb.fake'),
+                                ('beta', 'alpha.beta@yamdb.fake')):
+            django_user_model.objects.create(username=username, email=email)
+        url = '/api/v1/users/'
+        cases = (
+            ('username=alpha', ['alpha']),
+            ('username_prefix=alpha', ['alpha', 'alphabet']),
+            ('username_prefix=alp', ['alpha', 'alphabet', 'alps']),
+            ('email=alps@mountains.fake', ['alps']),
+            ('email_prefix=alpha', ['alpha', 'beta']),
+        )
+        for params, expected in cases:
+            with CaptureQueriesContext(connection) as context:
+                response = admin_client.get(f'{url}?{params}')
+            assert response.status_code == HTTPStatus.OK, (
+                f'Проверьте, что GET-запрос администратора к `{url}?{params}` '
+                'возвращает ответ со статусом 200.'
+            )
+            usernames = sorted(
+                user['username'] for user in response.json()['results']
+            )
+            assert usernames == expected, (
+                f'Проверьте, что GET-запрос к `{url}?{params}` находит '
+                'пользователей по точному значению или началу строки с '
+                'учетом регистра.'
+            )
+            assert not any(
+                'LIKE' in query['sql'] for query in context.captured_queries
+            ), (
+                f'Проверьте, что поиск `{url}?{params}` не использует LIKE, '
+                'а читает индекс поля диапазоном значений.'
+            )
+
+    def test_14_01_token_role_claims(self, client, admin, settings):
+        settings.AUTH_TOKEN_ROLE_CLAIMS = True
+        token = access_token_for_user(admin)
+        assert token['role'] == 'admin' and not token['is_superuser'], (
+            'Проверьте, что при AUTH_TOKEN_ROLE_CLAIMS токен доступа '
+            'содержит роль пользователя.'
+        )
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        url = '/api/v1/users/'
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(f'{url}?username=nobody')
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что GET-запрос администратора к `{url}` возвращает '
+            'ответ со статусом 200.'
+        )
+        assert len(context.captured_queries) == 1, (
+            'Проверьте, что права пользователя с ролью в токене проверяются '
+            'без обращения к базе данных.'
+        )
+
+        admin.role = 'user'
+        admin.save()
+        response = client.get(url)
+        assert response.status_code == HTTPStatus.FORBIDDEN, (
+            'Проверьте, что после изменения пользователя роль из ранее '
+            'выданного токена больше не используется.'
+        )
+
+    def test_14_02_token_role_claims_max_age(self, admin, settings):
+        settings.AUTH_TOKEN_ROLE_CLAIMS = True
+        token = access_token_for_user(admin)
+        token['role'] = 'user'
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        url = '/api/v1/users/'
+        response = client.get(url)
+        assert response.status_code == HTTPStatus.FORBIDDEN, (
+            'Проверьте, что права проверяются по роли из токена.'
+        )
+        settings.AUTH_TOKEN_CLAIMS_MAX_AGE = -1
+        response = client.get(url)
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что роль из токена старше '
+            'AUTH_TOKEN_CLAIMS_MAX_AGE не используется и пользователь '
+            'читается из базы данных.'
+        )
+
+    def test_12_03_users_bulk_create_ids_and_races(self, admin_client,
+                                                   django_user_model):
+        url = '/api/v1/users/bulk/'
+        leaver = django_user_model.objects.create(
+            username='leaver', email='leaver@yamdb.fake'
+        )
+        leaver_id = leaver.pk
+        leaver.delete()
+        response = admin_client.post(url, data=[
+            {'username': 'newcomer', 'email': 'newcomer@yamdb.fake'}
+        ], format='json')
+        assert response.status_code == HTTPStatus.CREATED
+        newcomer = django_user_model.objects.get(username='newcomer')
+        assert newcomer.pk > leaver_id, (
+            f'Проверьте, что POST-запрос к `{url}` не выдает новым '
+            'пользователям идентификаторы удаленных: токены удаленного '
+            'пользователя не должны подходить к чужой учетной записи.'
+        )
+
+        serializer = UserBulkSerializer(data=[
+            {'username': 'racer', 'email': 'racer@yamdb.fake'},
+            {'username': 'winner', 'email': 'winner@yamdb.fake'},
+        ], many=True)
+        assert serializer.is_valid()
+        django_user_model.objects.create(
+            username='racer', email='other@yamdb.fake'
+        )
+        serializer.save()
+        assert [user['username'] for user in serializer.data] == ['winner'], (
+            'Проверьте, что пользователь, занятый параллельным запросом '
+            'после проверки пакета, не мешает создать остальных.'
+        )
+        assert serializer.rejected == [
+            {'index': 0, 'errors': {
+                'username': ['Пользователь с таким username уже существует.']
+            }}
+        ], (
+            'Проверьте, что конфликт с параллельным запросом возвращается '
+            'в списке ошибок с номером элемента.'
+        )
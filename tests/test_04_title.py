@@ -1,9 +1,15 @@
+import csv
+import io
+import json
 from http import HTTPStatus
 
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 from tests.utils import (check_pagination, check_permissions,
-                         create_categories, create_genre, create_titles)
+                         count_queries, create_categories, create_genre,
+                         create_reviews, create_single_review, create_titles)
 
 
 @pytest.mark.django_db(transaction=True)
@@ -316,3 +322,594 @@ class Test04TitleAPI:
                           HTTPStatus.FORBIDDEN)
         check_permissions(moderator_client, url, data, 'модератора',
                           titles, HTTPStatus.FORBIDDEN)
+
+    def test_06_titles_cursor_pagination(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        url = '/api/v1/titles/'
+
+        response = client.get(f'{url}?cursor=&limit=1')
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что GET-запрос к `{url}` с параметром `cursor` '
+            'возвращает ответ со статусом 200.'
+        )
+        data = response.json()
+        assert set(data) == {'next', 'previous', 'results'}, (
+            f'Проверьте, что при передаче параметра `cursor` эндпоинт '
+            f'`{url}` использует курсорную пагинацию.'
+        )
+        received_ids = [title['id'] for title in data['results']]
+        response = client.get(data['next'])
+        data = response.json()
+        received_ids += [title['id'] for title in data['results']]
+        assert received_ids == sorted(
+            (title['id'] for title in titles), reverse=True
+        ), (
+            f'Проверьте, что курсорная пагинация эндпоинта `{url}` '
+            'возвращает произведения по убыванию `id` без пропусков.'
+        )
+        assert data['next'] is None, (
+            f'Проверьте, что на последней странице курсорной пагинации '
+            f'`{url}` ключ `next` равен `None`.'
+        )
+
+    def test_07_titles_query_count(self, client, admin_client):
+        titles, categories, genres = create_titles(admin_client)
+        url = '/api/v1/titles/'
+        detail_url = f'{url}{titles[0]["id"]}/'
+        list_queries = count_queries(client, url)
+        detail_queries = count_queries(client, detail_url)
+
+        for idx in range(8):
+            admin_client.post(url, data={
+                'name': f'Произведение {idx}',
+                'year': 2000 + idx,
+                'genre': [genre['slug'] for genre in genres],
+                'category': categories[idx % 2]['slug'],
+            })
+
+        assert list_queries <= 3, (
+            f'Проверьте, что GET-запрос к `{url}` загружает категории и '
+            'жанры произведений без отдельного запроса на каждый объект. '
+            f'Сейчас выполняется {list_queries} запросов к базе данных.'
+        )
+        assert count_queries(client, url) == list_queries, (
+            f'Проверьте, что количество запросов к базе данных при GET-запросе '
+            f'к `{url}` не зависит от числа произведений на странице.'
+        )
+        assert count_queries(client, detail_url) <= detail_queries <= 3, (
+            'Проверьте, что GET-запрос к `/api/v1/titles/{title_id}/` '
+            'загружает категорию и жанры произведения не более чем двумя '
+            'запросами к базе данных, не считая запроса версии произведения.'
+        )
+
+    def test_08_titles_anonymous_cache(self, client, admin_client,
+                                       user_client):
+        titles, _, _ = create_titles(admin_client)
+        url = '/api/v1/titles/'
+        detail_url = f'{url}{titles[0]["id"]}/'
+        count_queries(client, f'{url}?year=1984&limit=5')
+        count_queries(client, detail_url)
+
+        assert count_queries(client, f'{url}?limit=5&year=1984') == 0, (
+            f'Проверьте, что повторный GET-запрос анонимного пользователя к '
+            f'`{url}` с теми же параметрами обслуживается из кеша.'
+        )
+        assert count_queries(client, detail_url) == 0, (
+            'Проверьте, что повторный GET-запрос анонимного пользователя к '
+            '`/api/v1/titles/{title_id}/` обслуживается из кеша.'
+        )
+
+        create_single_review(user_client, titles[0]['id'], 'Отлично', 9)
+        response = client.get(detail_url)
+        assert response.json().get('rating') == 9, (
+            'Проверьте, что после создания отзыва кеш произведения '
+            'сбрасывается и возвращается актуальный рейтинг.'
+        )
+        response = client.get(f'{url}?year=1984&limit=5')
+        assert response.json()['results'][0].get('rating') == 9, (
+            f'Проверьте, что после создания отзыва кеш списка `{url}` '
+            'сбрасывается и возвращается актуальный рейтинг.'
+        )
+
+        admin_client.patch(detail_url, data={'name': 'Терминатор 2'})
+        response = client.get(detail_url)
+        assert response.json().get('name') == 'Терминатор 2', (
+            'Проверьте, что после изменения произведения кеш '
+            '`/api/v1/titles/{title_id}/` сбрасывается.'
+        )
+
+    def test_09_titles_etag(self, client, admin_client, user_client):
+        titles, _, _ = create_titles(admin_client)
+        detail_url = f'/api/v1/titles/{titles[0]["id"]}/'
+
+        for url in ('/api/v1/titles/', '/api/v1/categories/',
+                    '/api/v1/genres/', detail_url):
+            etag = client.get(url).get('ETag')
+            assert etag, (
+                f'Проверьте, что ответ на GET-запрос к `{url}` содержит '
+                'заголовок `ETag`.'
+            )
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+            assert response.status_code == HTTPStatus.NOT_MODIFIED, (
+                f'Проверьте, что GET-запрос к `{url}` с актуальным '
+                '`If-None-Match` возвращает ответ со статусом 304.'
+            )
+
+        etag = client.get(detail_url).get('ETag')
+        create_single_review(user_client, titles[0]['id'], 'Отлично', 9)
+        response = client.get(detail_url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что после изменения рейтинга произведения ETag '
+            '`/api/v1/titles/{title_id}/` меняется.'
+        )
+        assert response.get('ETag') != etag, (
+            'Проверьте, что после создания отзыва произведение получает '
+            'новый ETag.'
+        )
+
+        etag = response.get('ETag')
+        create_single_review(user_client, titles[1]['id'], 'Неплохо', 7)
+        response = client.get(detail_url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.NOT_MODIFIED, (
+            'Проверьте, что ETag `/api/v1/titles/{title_id}/` строится по '
+            'версии самого произведения и не меняется от отзывов к другим '
+            'произведениям.'
+        )
+        admin_client.patch(detail_url, data={'description': 'Новое описание'})
+        response = client.get(detail_url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что после изменения произведения ETag '
+            '`/api/v1/titles/{title_id}/` меняется.'
+        )
+
+        response = client.get('/api/v1/titles/99999/', HTTP_IF_NONE_MATCH='*')
+        assert response.status_code == HTTPStatus.NOT_FOUND, (
+            'Проверьте, что GET-запрос к несуществующему произведению с '
+            '`If-None-Match: *` возвращает ответ со статусом 404.'
+        )
+        response = client.get(detail_url, HTTP_IF_NONE_MATCH='*')
+        assert response.status_code == HTTPStatus.NOT_MODIFIED, (
+            'Проверьте, что `If-None-Match: *` для существующего '
+            'произведения возвращает ответ со статусом 304.'
+        )
+
+    def test_10_titles_search(self, client, admin_client):
+        titles, categories, genres = create_titles(admin_client)
+        url = '/api/v1/titles/'
+        admin_client.post(url, data={
+            'name': 'Орешки',
+            'year': 2001,
+            'genre': [genres[0]['slug']],
+            'category': categories[0]['slug'],
+            'description': 'Про терминатора ни слова.'
+        })
+
+        response = client.get(f'{url}?search=ОРЕШЕК')
+        names = [title['name'] for title in response.json()['results']]
+        assert names == ['Крепкий орешек'], (
+            f'Проверьте, что параметр `search` эндпоинта `{url}` ищет '
+            'произведения по словам без учета регистра кириллицы.'
+        )
+
+        response = client.get(f'{url}?search=термин')
+        names = [title['name'] for title in response.json()['results']]
+        assert names == ['Терминатор', 'Орешки'], (
+            f'Проверьте, что параметр `search` эндпоинта `{url}` ищет по '
+            'началу слов в названии и описании и сортирует результаты по '
+            'релевантности.'
+        )
+        response = client.get(f'{url}?search=термин&cursor=')
+        names = [title['name'] for title in response.json()['results']]
+        assert names == ['Терминатор', 'Орешки'], (
+            f'Проверьте, что с параметром `cursor` результаты поиска '
+            f'эндпоинта `{url}` тоже сортируются по релевантности.'
+        )
+
+        admin_client.patch(
+            f'{url}{titles[0]["id"]}/', data={'name': 'Хищник'}
+        )
+        response = client.get(f'{url}?search=хищник')
+        assert len(response.json()['results']) == 1, (
+            f'Проверьте, что поисковый индекс эндпоинта `{url}` обновляется '
+            'при изменении произведения.'
+        )
+        admin_client.delete(f'{url}{titles[0]["id"]}/')
+        response = client.get(f'{url}?search=хищник')
+        assert response.json()['results'] == [], (
+            f'Проверьте, что поисковый индекс эндпоинта `{url}` обновляется '
+            'при удалении произведения.'
+        )
+
+    def test_11_titles_top(self, client, admin_client, admin,
+                           user_client, user, moderator_client, moderator):
+        author_map = {
+            admin: admin_client,
+            user: user_client,
+            moderator: moderator_client
+        }
+        _, titles = create_reviews(admin_client, author_map)
+        create_single_review(user_client, titles[1]['id'], 'Шедевр', 10)
+        url = '/api/v1/titles/top/'
+
+        response = client.get(url)
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что GET-запрос к `{url}` возвращает ответ со '
+            'статусом 200.'
+        )
+        assert [title['id'] for title in response.json()] == [
+            titles[0]['id']
+        ], (
+            f'Проверьте, что `{url}` возвращает только произведения, у '
+            'которых набралось минимальное количество отзывов.'
+        )
+
+        for params, expected in (
+            (f'genre={titles[0]["genre"][0]}', [titles[0]['id']]),
+            (f'category={titles[0]["category"]}', [titles[0]['id']]),
+            (f'genre={titles[1]["genre"][0]}', []),
+            (f'category={titles[1]["category"]}', []),
+        ):
+            response = client.get(f'{url}?{params}')
+            assert [title['id'] for title in response.json()] == expected, (
+                f'Проверьте, что `{url}` поддерживает фильтрацию по '
+                'параметрам `genre` и `category`.'
+            )
+
+        admin_client.patch(f'/api/v1/titles/{titles[0]["id"]}/', data={
+            'genre': titles[0]['genre'] + titles[1]['genre']
+        })
+        response = client.get(f'{url}?genre={titles[1]["genre"][0]}&limit=1')
+        assert [title['id'] for title in response.json()] == [
+            titles[0]['id']
+        ], (
+            f'Проверьте, что топ жанра `{url}` обновляется при изменении '
+            'жанров произведения.'
+        )
+
+    def test_12_titles_facets(self, client, admin_client):
+        titles, categories, genres = create_titles(admin_client)
+        url = '/api/v1/titles/'
+        admin_client.post(url, data={
+            'name': 'Чужой',
+            'year': 1984,
+            'genre': [genres[0]['slug']],
+            'category': categories[0]['slug'],
+        })
+
+        def facet(response, name):
+            return {
+                item['value']: item['count']
+                for item in response.json()['facets'][name]
+            }
+
+        response = client.get(f'{url}?facets=genre,category,year')
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что GET-запрос к `{url}` с параметром `facets` '
+            'возвращает ответ со статусом 200.'
+        )
+        assert facet(response, 'genre') == {
+            genres[0]['slug']: 2, genres[1]['slug']: 1, genres[2]['slug']: 1
+        }, (
+            f'Проверьте, что `{url}?facets=genre` возвращает количество '
+            'произведений по жанрам.'
+        )
+        assert facet(response, 'category') == {
+            categories[0]['slug']: 2, categories[1]['slug']: 1
+        }, (
+            f'Проверьте, что `{url}?facets=category` возвращает количество '
+            'произведений по категориям.'
+        )
+        assert response.json()['facets']['year'][0] == {
+            'value': 1984, 'count': 2
+        }, (
+            f'Проверьте, что `{url}?facets=year` возвращает количество '
+            'произведений по годам, начиная с самого частого значения.'
+        )
+
+        response = client.get(
+            f'{url}?facets=genre,year&category={categories[0]["slug"]}'
+        )
+        assert facet(response, 'genre') == {
+            genres[0]['slug']: 2, genres[1]['slug']: 1
+        }, (
+            f'Проверьте, что фасеты эндпоинта `{url}` учитывают примененные '
+            'фильтры.'
+        )
+        assert facet(response, 'year') == {1984: 2}
+
+        admin_client.patch(f'{url}{titles[1]["id"]}/', data={
+            'year': 1984, 'genre': [genres[0]['slug']]
+        })
+        admin_client.delete(f'{url}{titles[0]["id"]}/')
+        response = client.get(f'{url}?facets=genre,year')
+        assert facet(response, 'genre') == {genres[0]['slug']: 2}, (
+            f'Проверьте, что фасеты эндпоинта `{url}` обновляются при '
+            'изменении и удалении произведений.'
+        )
+        assert facet(response, 'year') == {1984: 2}
+
+        response = client.get(f'{url}?facets=genre,rating')
+        assert response.status_code == HTTPStatus.BAD_REQUEST, (
+            f'Проверьте, что `{url}` возвращает ответ со статусом 400 для '
+            'неизвестного фасета.'
+        )
+
+    def test_13_titles_bulk(self, client, user_client, admin_client):
+        titles, categories, genres = create_titles(admin_client)
+        url = '/api/v1/titles/bulk/'
+        data = [
+            {
+                'name': f'Произведение {idx}',
+                'year': 2000 + idx,
+                'genre': [genres[idx % 3]['slug']],
+                'category': categories[idx % 2]['slug'],
+            }
+            for idx in range(20)
+        ]
+        response = user_client.post(url, data=data, format='json')
+        assert response.status_code == HTTPStatus.FORBIDDEN, (
+            f'Проверьте, что POST-запрос пользователя к `{url}` возвращает '
+            'ответ со статусом 403.'
+        )
+
+        for invalid, field in (
+            ({**data[2], 'year': 'год'}, 'year'),
+            ({**data[2], 'genre': ['unknown']}, 'genre'),
+            ({**data[2], 'id': 0}, 'id'),
+        ):
+            response = admin_client.post(
+                url, data=data[:2] + [invalid], format='json'
+            )
+            assert response.status_code == HTTPStatus.BAD_REQUEST, (
+                f'Проверьте, что `{url}` возвращает ответ со статусом 400, '
+                'если в пакете есть некорректные произведения.'
+            )
+            errors = response.json()
+            assert errors[:2] == [{}, {}] and field in errors[2], (
+                f'Проверьте, что `{url}` возвращает ошибки по каждому '
+                'элементу пакета.'
+            )
+        assert client.get('/api/v1/titles/').json()['count'] == 2, (
+            f'Проверьте, что `{url}` не сохраняет пакет с ошибками.'
+        )
+
+        with CaptureQueriesContext(connection) as context:
+            response = admin_client.post(url, data=data, format='json')
+        assert response.status_code == HTTPStatus.CREATED, (
+            f'Проверьте, что POST-запрос администратора к `{url}` '
+            'возвращает ответ со статусом 201.'
+        )
+        created = response.json()
+        assert [item['name'] for item in created] == [
+            item['name'] for item in data
+        ] and all(item['id'] for item in created), (
+            f'Проверьте, что `{url}` возвращает созданные произведения с '
+            'их `id`.'
+        )
+        assert len(context.captured_queries) <= 20, (
+            f'Проверьте, что `{url}` сохраняет пакет постоянным числом '
+            'запросов к базе данных, а не запросами на каждое произведение.'
+        )
+        response = client.get(f'/api/v1/titles/{created[5]["id"]}/')
+        assert response.json()['genre'] == [genres[2]], (
+            f'Проверьте, что `{url}` сохраняет жанры произведений.'
+        )
+
+        response = admin_client.post(url, data=[{
+            'id': titles[0]['id'],
+            'name': 'Терминатор 2',
+            'year': 1991,
+            'genre': [genres[2]['slug']],
+            'category': categories[1]['slug'],
+        }], format='json')
+        assert response.status_code == HTTPStatus.CREATED
+        response = client.get(f'/api/v1/titles/{titles[0]["id"]}/')
+        assert (
+            response.json()['name'] == 'Терминатор 2'
+            and response.json()['genre'] == [genres[2]]
+        ), (
+            f'Проверьте, что элементы с `id` в запросе к `{url}` обновляют '
+            'существующие произведения и их жанры.'
+        )
+        response = client.get(
+            '/api/v1/titles/?facets=genre&search=Терминатор'
+        )
+        assert response.json()['results'][0]['name'] == 'Терминатор 2', (
+            f'Проверьте, что `{url}` обновляет поисковый индекс.'
+        )
+        response = client.get('/api/v1/titles/?facets=genre')
+        counts = {
+            item['value']: item['count']
+            for item in response.json()['facets']['genre']
+        }
+        assert counts == {
+            genres[0]['slug']: 7, genres[1]['slug']: 7,
+            genres[2]['slug']: 8,
+        }, (
+            f'Проверьте, что `{url}` обновляет счетчики фасетов.'
+        )
+
+    def test_13_02_titles_bulk_ids(self, admin_client):
+        titles, categories, genres = create_titles(admin_client)
+        url = '/api/v1/titles/bulk/'
+        deleted_id = titles[-1]['id']
+        admin_client.delete(f'/api/v1/titles/{deleted_id}/')
+        item = {
+            'name': 'Новое произведение',
+            'year': 2000,
+            'genre': [genres[0]['slug']],
+            'category': categories[0]['slug'],
+        }
+        response = admin_client.post(url, data=[item, item], format='json')
+        assert response.status_code == HTTPStatus.CREATED
+        ids = [title['id'] for title in response.json()]
+        assert min(ids) > deleted_id, (
+            f'Проверьте, что `{url}` не выдает новым произведениям '
+            'идентификаторы удаленных.'
+        )
+        response = admin_client.post(
+            '/api/v1/titles/', data=item, format='json'
+        )
+        assert response.json()['id'] > max(ids), (
+            f'Проверьте, что после `{url}` новые произведения получают '
+            'следующие свободные идентификаторы.'
+        )
+
+    def test_14_titles_sparse_fields(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        url = '/api/v1/titles/'
+
+        response = client.get(f'{url}?fields=id,name')
+        assert response.json()['results'] == [
+            {'id': title['id'], 'name': title['name']}
+            for title in reversed(titles)
+        ], (
+            f'Проверьте, что параметр `fields` эндпоинта `{url}` оставляет в '
+            'ответе только перечисленные поля.'
+        )
+        with CaptureQueriesContext(connection) as context:
+            client.get(f'{url}?fields=name&cursor=')
+        assert len(context.captured_queries) == 1, (
+            f'Проверьте, что `{url}` не загружает жанры и категории, если '
+            'они не запрошены в параметре `fields`.'
+        )
+        assert 'description' not in context.captured_queries[0]['sql'], (
+            f'Проверьте, что `{url}` не читает из базы данных столбцы полей, '
+            'не перечисленных в параметре `fields`.'
+        )
+
+        response = client.get(f'{url}{titles[0]["id"]}/?fields=genre,year')
+        assert set(response.json()) == {'genre', 'year'}, (
+            'Проверьте, что параметр `fields` поддерживается эндпоинтом '
+            '`/api/v1/titles/{title_id}/`.'
+        )
+        response = client.get(f'{url}?fields=name,author')
+        assert response.status_code == HTTPStatus.BAD_REQUEST, (
+            f'Проверьте, что `{url}` возвращает ответ со статусом 400 для '
+            'неизвестных полей в параметре `fields`.'
+        )
+
+    def test_15_titles_export(self, client, user_client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        url = '/api/v1/titles/export/{}/'
+        for export_format in ('ndjson', 'csv'):
+            for request_client in (client, user_client):
+                response = request_client.get(url.format(export_format))
+                assert response.status_code in (
+                    HTTPStatus.UNAUTHORIZED, HTTPStatus.FORBIDDEN
+                ), (
+                    f'Проверьте, что выгрузка `{url.format(export_format)}` '
+                    'доступна только администратору.'
+                )
+
+        response = admin_client.get(url.format('ndjson'))
+        assert response.status_code == HTTPStatus.OK and response.streaming, (
+            f'Проверьте, что `{url.format("ndjson")}` возвращает потоковый '
+            'ответ со статусом 200.'
+        )
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        expected = [
+            admin_client.get(f'/api/v1/titles/{title["id"]}/').json()
+            for title in titles
+        ]
+        assert [json.loads(line) for line in lines] == expected, (
+            f'Проверьте, что `{url.format("ndjson")}` выгружает каждое '
+            'произведение отдельной строкой JSON в формате API.'
+        )
+
+        response = admin_client.get(url.format('csv'))
+        rows = list(csv.reader(io.StringIO(
+            b''.join(response.streaming_content).decode()
+        )))
+        assert rows[0] == [
+            'id', 'name', 'year', 'rating', 'review_count', 'description',
+            'genre', 'category'
+        ] and len(rows) == 3, (
+            f'Проверьте, что `{url.format("csv")}` выгружает строку '
+            'заголовков и строку для каждого произведения.'
+        )
+        assert rows[1][6] == ','.join(titles[0]['genre']), (
+            f'Проверьте, что `{url.format("csv")}` выгружает слаги жанров '
+            'произведения.'
+        )
+
+    def test_16_titles_slug_snapshot(self, admin_client):
+        titles, categories, genres = create_titles(admin_client)
+        url = '/api/v1/titles/'
+        data = {
+            'name': 'Чужой',
+            'year': 1979,
+            'genre': [genre['slug'] for genre in genres],
+            'category': categories[0]['slug'],
+        }
+        admin_client.post(url, data=data)
+        with CaptureQueriesContext(connection) as context:
+            response = admin_client.post(url, data=data)
+        assert response.status_code == HTTPStatus.CREATED
+        slug_queries = [
+            query['sql'] for query in context.captured_queries
+            if '"reviews_category"."slug" =' in query['sql']
+            or '"reviews_genre"."slug" =' in query['sql']
+        ]
+        assert not slug_queries, (
+            f'Проверьте, что POST-запрос к `{url}` проверяет слаги категорий '
+            'и жанров без запросов к базе данных. Выполнены запросы: '
+            f'{slug_queries}'
+        )
+        assert response.json()['category'] == categories[0], (
+            f'Проверьте, что POST-запрос к `{url}` возвращает категорию '
+            'произведения.'
+        )
+
+        admin_client.delete(f'/api/v1/categories/{categories[0]["slug"]}/')
+        response = admin_client.post(url, data=data)
+        assert response.status_code == HTTPStatus.BAD_REQUEST, (
+            f'Проверьте, что POST-запрос к `{url}` не принимает слаг '
+            'удаленной категории.'
+        )
+        admin_client.post(
+            '/api/v1/categories/', data={'name': 'Сериал', 'slug': 'series'}
+        )
+        response = admin_client.post(url, data={**data, 'category': 'series'})
+        assert response.status_code == HTTPStatus.CREATED, (
+            f'Проверьте, что POST-запрос к `{url}` принимает слаг только что '
+            'созданной категории.'
+        )
+
+        from api.snapshots import category_snapshot
+        category_snapshot.get('series').name = 'Изменено'
+        assert category_snapshot.get('series').name == 'Сериал', (
+            'Проверьте, что снимок категорий отдает копии объектов и '
+            'изменение полученного объекта не меняет снимок.'
+        )
+
+    def test_17_titles_genre_order(self, client, admin_client):
+        from reviews.models import Genre, GenreTitle
+        titles, _, _ = create_titles(admin_client)
+        title_id = titles[1]['id']
+        GenreTitle.objects.filter(title_id=title_id).delete()
+        genre_ids = list(
+            Genre.objects.order_by('-id').values_list('id', flat=True)
+        )
+        for genre_id in genre_ids:
+            GenreTitle.objects.create(title_id=title_id, genre_id=genre_id)
+        expected = [
+            Genre.objects.get(pk=genre_id).slug for genre_id in genre_ids
+        ]
+        url = '/api/v1/titles/'
+        response = client.get(f'{url}{title_id}/')
+        assert [
+            genre['slug'] for genre in response.json()['genre']
+        ] == expected, (
+            f'Проверьте, что `{url}{{title_id}}/` возвращает жанры в порядке '
+            'их добавления к произведению.'
+        )
+        response = client.get(url)
+        title = next(
+            title for title in response.json()['results']
+            if title['id'] == title_id
+        )
+        assert [genre['slug'] for genre in title['genre']] == expected, (
+            f'Проверьте, что `{url}` возвращает жанры в порядке их '
+            'добавления к произведению.'
+        )
@@ -1,10 +1,13 @@
 from http import HTTPStatus
 
 import pytest
+from django.core.management import call_command
+from django.db import connection
 from django.db.utils import IntegrityError
+from django.test.utils import CaptureQueriesContext
 
-from tests.utils import (check_fields, check_pagination, create_reviews,
-                         create_single_review, create_titles)
+from tests.utils import (check_fields, check_pagination, count_queries,
+                         create_reviews, create_single_review, create_titles)
 
 
 @pytest.mark.django_db(transaction=True)
@@ -384,3 +387,194 @@ class Test05ReviewAPI:
                 f'Проверьте, что DELETE-запрос {role} к чужому отзыву через '
                 f'`{url_template}` удаляет отзыв.'
             )
+
+    def test_06_review_rating_aggregates(self, admin_client, admin,
+                                         user_client, user,
+                                         moderator_client, moderator):
+        author_map = {
+            admin: admin_client,
+            user: user_client,
+            moderator: moderator_client
+        }
+        reviews, titles = create_reviews(admin_client, author_map)
+        title_url = f'/api/v1/titles/{titles[0]["id"]}/'
+        review_url = title_url + 'reviews/{review_id}/'
+
+        response = admin_client.get(title_url)
+        assert response.json().get('rating') == 5, (
+            'Проверьте, что рейтинг произведения учитывает оценки всех '
+            'созданных отзывов.'
+        )
+
+        user_client.patch(
+            review_url.format(review_id=reviews[1]['id']), data={'score': 8}
+        )
+        response = admin_client.get(title_url)
+        assert response.json().get('rating') == 6, (
+            'Проверьте, что после изменения оценки отзыва рейтинг '
+            'произведения пересчитывается.'
+        )
+
+        user_client.delete(review_url.format(review_id=reviews[1]['id']))
+        response = admin_client.get(title_url)
+        assert response.json().get('rating') == 5, (
+            'Проверьте, что после удаления отзыва рейтинг произведения '
+            'пересчитывается.'
+        )
+
+        from reviews.models import Title
+        Title.objects.filter(pk=titles[0]['id']).update(
+            score_sum=0, review_count=0, rating=None
+        )
+        call_command('rebuild_aggregates')
+        title = Title.objects.get(pk=titles[0]['id'])
+        assert (title.score_sum, title.review_count, title.rating) == (
+            10, 2, 5
+        ), (
+            'Проверьте, что команда `rebuild_aggregates` восстанавливает '
+            'рейтинг произведения по отзывам.'
+        )
+
+        user_client.post(
+            title_url + 'reviews/', data={'text': 'Новый отзыв', 'score': 2}
+        )
+        title.name = 'Новое название'
+        title.save()
+        title = Title.objects.get(pk=titles[0]['id'])
+        assert (title.score_sum, title.review_count) == (12, 3), (
+            'Проверьте, что сохранение произведения, загруженного до '
+            'изменения отзывов, не затирает счетчики рейтинга.'
+        )
+
+    def test_07_review_sparse_fields(self, client, admin_client, admin,
+                                     user_client, user):
+        reviews, titles = create_reviews(
+            admin_client, {admin: admin_client, user: user_client}
+        )
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+
+        response = client.get(f'{url}?fields=id,score')
+        assert response.json()['results'] == [
+            {'id': review['id'], 'score': review['score']}
+            for review in reversed(reviews)
+        ], (
+            f'Проверьте, что параметр `fields` эндпоинта `{url}` оставляет в '
+            'ответе только перечисленные поля.'
+        )
+        response = client.get(f'{url}?fields=text&cursor=')
+        assert [review['text'] for review in response.json()['results']] == [
+            review['text'] for review in reversed(reviews)
+        ], (
+            f'Проверьте, что параметр `fields` эндпоинта `{url}` работает с '
+            'курсорной пагинацией.'
+        )
+
+    def test_08_review_create_queries(self, admin_client, user_client):
+        titles, _, _ = create_titles(admin_client)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        data = {'text': 'Отличный фильм', 'score': 9}
+
+        with CaptureQueriesContext(connection) as context:
+            response = user_client.post(url, data=data)
+        assert response.status_code == HTTPStatus.CREATED
+        queries = [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith(('SELECT', 'INSERT', 'UPDATE'))
+        ]
+        assert not any(
+            'FROM "reviews_title"' in query or 'FROM "reviews_review"' in query
+            for query in queries if query.startswith('SELECT')
+        ), (
+            f'Проверьте, что POST-запрос к `{url}` не проверяет заранее '
+            'существование произведения и повторный отзыв отдельными '
+            f'запросами. Выполнены запросы: {queries}'
+        )
+
+        response = user_client.post(url, data=data)
+        assert response.status_code == HTTPStatus.BAD_REQUEST, (
+            f'Проверьте, что повторный POST-запрос пользователя к `{url}` '
+            'возвращает ответ со статусом 400.'
+        )
+        assert response.json() == {
+            'non_field_errors': ['Вы уже оставили отзыв.']
+        }, (
+            f'Проверьте, что повторный POST-запрос пользователя к `{url}` '
+            'сообщает, что отзыв уже оставлен.'
+        )
+        response = user_client.post(
+            '/api/v1/titles/999/reviews/', data=data
+        )
+        assert response.status_code == HTTPStatus.NOT_FOUND
+        from reviews.models import Review
+        assert Review.objects.count() == 1, (
+            'Проверьте, что отзыв к несуществующему произведению не '
+            'сохраняется в базе данных.'
+        )
+
+    def test_09_review_list_query_count(self, client, admin_client,
+                                        user_client, moderator_client):
+        titles, _, _ = create_titles(admin_client)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        create_single_review(user_client, titles[0]['id'], 'Первый', 5)
+        single_queries = count_queries(client, url)
+
+        create_single_review(admin_client, titles[0]['id'], 'Второй', 6)
+        create_single_review(moderator_client, titles[0]['id'], 'Третий', 7)
+        assert count_queries(client, url) == single_queries <= 3, (
+            f'Проверьте, что GET-запрос к `{url}` загружает авторов отзывов '
+            'вместе с отзывами, а количество запросов к базе данных не '
+            'зависит от числа отзывов на странице.'
+        )
+        assert count_queries(client, f'{url}?cursor=') <= 2, (
+            f'Проверьте, что курсорная пагинация `{url}` загружает страницу '
+            'отзывов вместе с авторами.'
+        )
+
+    def test_10_user_reviews_feed(self, client, admin_client, admin,
+                                  user_client, user):
+        titles, _, _ = create_titles(admin_client)
+        for title in titles:
+            create_single_review(user_client, title['id'], 'Отзыв', 7)
+        create_single_review(admin_client, titles[0]['id'], 'Чужой', 3)
+        url = f'/api/v1/users/{user.username}/reviews/'
+
+        response = client.get(url)
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что GET-запрос к `{url}` возвращает ответ со '
+            'статусом 200.'
+        )
+        results = response.json()['results']
+        assert [review['title'] for review in results] == [
+            {'id': title['id'], 'name': title['name'], 'year': title['year']}
+            for title in reversed(titles)
+        ], (
+            f'Проверьте, что `{url}` возвращает отзывы пользователя от '
+            'новых к старым с кратким описанием произведения.'
+        )
+        assert {review['author'] for review in results} == {user.username}
+        assert 'next' in response.json() and 'count' not in response.json(), (
+            f'Проверьте, что `{url}` использует курсорную пагинацию.'
+        )
+        assert count_queries(client, url) == 2, (
+            f'Проверьте, что `{url}` загружает отзывы вместе с произведениями '
+            'одним запросом к базе данных.'
+        )
+
+        response = user_client.get('/api/v1/users/me/reviews/?limit=1')
+        assert [review['id'] for review in response.json()['results']] == [
+            results[0]['id']
+        ], (
+            'Проверьте, что `/api/v1/users/me/reviews/` возвращает отзывы '
+            'текущего пользователя и поддерживает параметр `limit`.'
+        )
+        response = client.get('/api/v1/users/me/reviews/')
+        assert response.status_code == HTTPStatus.UNAUTHORIZED, (
+            'Проверьте, что запрос неавторизованного пользователя к '
+            '`/api/v1/users/me/reviews/` возвращает ответ со статусом 401.'
+        )
+        response = client.get('/api/v1/users/unknown/reviews/')
+        assert response.status_code == HTTPStatus.NOT_FOUND, (
+            'Проверьте, что запрос к `/api/v1/users/{username}/reviews/` '
+            'для несуществующего пользователя возвращает ответ со '
+            'статусом 404.'
+        )
@@ -1,9 +1,11 @@
 from http import HTTPStatus
 
 import pytest
+from django.core.management import call_command
 
-from tests.utils import (check_fields, check_pagination, create_comments,
-                         create_reviews, create_single_comment)
+from tests.utils import (check_fields, check_pagination, count_queries,
+                         create_comments, create_reviews,
+                         create_single_comment)
 
 
 @pytest.mark.django_db(transaction=True)
@@ -381,3 +383,122 @@ class Test06CommentAPI:
             'Проверьте, что DELETE-запрос неавторизованного пользователя к '
             f'`{url}` возвращает ответ со статусом 401.'
         )
+
+    def test_07_comment_list_query_count(self, client, admin_client, admin,
+                                         user_client, user,
+                                         moderator_client, moderator):
+        reviews, titles = create_reviews(admin_client, {admin: admin_client})
+        url = (
+            f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[0]["id"]}/'
+            'comments/'
+        )
+        create_single_comment(
+            user_client, titles[0]['id'], reviews[0]['id'], 'Первый'
+        )
+        single_queries = count_queries(client, url)
+
+        for request_client in (admin_client, moderator_client):
+            create_single_comment(
+                request_client, titles[0]['id'], reviews[0]['id'], 'Еще'
+            )
+        assert count_queries(client, url) == single_queries <= 3, (
+            f'Проверьте, что GET-запрос к `{url}` загружает авторов '
+            'комментариев вместе с комментариями, а количество запросов к '
+            'базе данных не зависит от числа комментариев на странице.'
+        )
+
+    def test_08_comment_nested_lookup(self, client, admin_client, admin):
+        comments, reviews, titles = create_comments(
+            admin_client, {admin: admin_client}
+        )
+        url = (
+            '/api/v1/titles/{title_id}/reviews/{review_id}/comments/'
+        )
+        detail_url = url.format(
+            title_id=titles[0]['id'], review_id=reviews[0]['id']
+        ) + f'{comments[0]["id"]}/'
+        assert count_queries(client, detail_url) == 1, (
+            'Проверьте, что GET-запрос к `/api/v1/titles/{title_id}/reviews/'
+            '{review_id}/comments/{comment_id}/` находит комментарий вместе '
+            'с отзывом и произведением одним запросом к базе данных.'
+        )
+        list_url = url.format(
+            title_id=titles[0]['id'], review_id=reviews[0]['id']
+        )
+        assert count_queries(client, list_url) <= 3, (
+            f'Проверьте, что GET-запрос к `{url}` проверяет отзыв и '
+            'произведение одним запросом к базе данных.'
+        )
+
+        for wrong_url in (
+            url.format(title_id=titles[1]['id'], review_id=reviews[0]['id']),
+            url.format(title_id=titles[1]['id'], review_id=reviews[0]['id'])
+            + f'{comments[0]["id"]}/',
+            url.format(title_id=999, review_id=reviews[0]['id']),
+        ):
+            response = client.get(wrong_url)
+            assert response.status_code == HTTPStatus.NOT_FOUND, (
+                f'Проверьте, что GET-запрос к `{wrong_url}` для отзыва '
+                'другого произведения возвращает ответ со статусом 404.'
+            )
+        response = admin_client.post(
+            url.format(title_id=titles[1]['id'], review_id=reviews[0]['id']),
+            data={'text': 'Комментарий'}
+        )
+        assert response.status_code == HTTPStatus.NOT_FOUND, (
+            f'Проверьте, что POST-запрос к `{url}` для отзыва другого '
+            'произведения возвращает ответ со статусом 404.'
+        )
+
+    def test_09_comment_count(self, client, admin_client, admin,
+                              user_client, user):
+        comments, reviews, titles = create_comments(
+            admin_client, {admin: admin_client, user: user_client}
+        )
+        review_url = (
+            f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[0]["id"]}/'
+        )
+        response = client.get(review_url)
+        assert response.json().get('comment_count') == 2, (
+            'Проверьте, что ответ на GET-запрос к `/api/v1/titles/{title_id}/'
+            'reviews/{review_id}/` содержит количество комментариев '
+            '`comment_count`.'
+        )
+        response = client.get(f'/api/v1/titles/{titles[0]["id"]}/')
+        assert response.json().get('review_count') == 2, (
+            'Проверьте, что ответ на GET-запрос к `/api/v1/titles/{title_id}/`'
+            ' содержит количество отзывов `review_count`.'
+        )
+
+        user_client.delete(f'{review_url}comments/{comments[1]["id"]}/')
+        response = client.get(review_url)
+        assert response.json().get('comment_count') == 1, (
+            'Проверьте, что после удаления комментария счетчик '
+            '`comment_count` отзыва уменьшается.'
+        )
+
+        from reviews.models import Review
+        Review.objects.update(comment_count=0)
+        call_command('rebuild_aggregates')
+        response = client.get(review_url)
+        assert response.json().get('comment_count') == 1, (
+            'Проверьте, что команда `rebuild_aggregates` восстанавливает '
+            'счетчики комментариев отзывов.'
+        )
+
+        review = Review.objects.get(pk=reviews[0]['id'])
+        user_client.post(f'{review_url}comments/', data={'text': 'Еще'})
+        review.text = 'Новый текст'
+        review.save()
+        response = client.get(review_url)
+        assert response.json().get('comment_count') == 2, (
+            'Проверьте, что сохранение отзыва, загруженного до изменения '
+            'комментариев, не затирает счетчик `comment_count`.'
+        )
+
+        admin_client.delete(review_url)
+        response = client.get(f'/api/v1/titles/{titles[0]["id"]}/')
+        assert response.json().get('review_count') == 1, (
+            'Проверьте, что после удаления отзыва с комментариями счетчик '
+            '`review_count` произведения уменьшается.'
+        )
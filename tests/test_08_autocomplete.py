@@ -0,0 +1,116 @@
+from http import HTTPStatus
+
+import pytest
+
+from api.cache import bump_version
+from reviews.models import Genre
+
+from tests.utils import count_queries, create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test08AutocompleteAPI:
+    url = '/api/v1/autocomplete/'
+
+    def test_01_autocomplete_validation(self, client):
+        response = client.get(self.url)
+        assert response.status_code != HTTPStatus.NOT_FOUND, (
+            f'Эндпоинт `{self.url}` не найден. Проверьте настройки в '
+            '*urls.py*.'
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST, (
+            f'Проверьте, что GET-запрос к `{self.url}` без параметра `q` '
+            'возвращает ответ со статусом 400.'
+        )
+
+    def test_02_autocomplete(self, client, admin_client):
+        titles, categories, genres = create_titles(admin_client)
+
+        response = client.get(f'{self.url}?q=ОРЕ')
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что GET-запрос к `{self.url}` возвращает ответ со '
+            'статусом 200.'
+        )
+        assert response.json() == {
+            'titles': [{'id': titles[1]['id'], 'name': titles[1]['name']}],
+            'genres': [],
+            'categories': [],
+        }, (
+            f'Проверьте, что `{self.url}` находит произведения по началу '
+            'любого слова названия без учета регистра и возвращает только '
+            '`id` и `name`.'
+        )
+
+        response = client.get(f'{self.url}?q=ко')
+        data = response.json()
+        assert [genre['slug'] for genre in data['genres']] == ['comedy'], (
+            f'Проверьте, что `{self.url}` находит жанры по началу названия.'
+        )
+        assert set(data['genres'][0]) == {'id', 'name', 'slug'}, (
+            f'Проверьте, что `{self.url}` возвращает для жанров только '
+            '`id`, `name` и `slug`.'
+        )
+
+        admin_client.post('/api/v1/categories/', data={
+            'name': 'Комиксы', 'slug': 'comics'
+        })
+        admin_client.delete(f'/api/v1/genres/{genres[1]["slug"]}/')
+        data = client.get(f'{self.url}?q=ко').json()
+        assert data['genres'] == [] and [
+            category['slug'] for category in data['categories']
+        ] == ['comics'], (
+            f'Проверьте, что индекс `{self.url}` обновляется при создании '
+            'и удалении жанров и категорий.'
+        )
+        assert count_queries(client, f'{self.url}?q=ко') == 0, (
+            f'Проверьте, что `{self.url}` отвечает из индекса в памяти без '
+            'запросов к базе данных.'
+        )
+
+    def test_03_autocomplete_after_bulk(self, client, admin_client):
+        titles, categories, genres = create_titles(admin_client)
+        client.get(f'{self.url}?q=ко')
+        response = admin_client.post('/api/v1/titles/bulk/', data=[
+            {
+                'name': f'Комета {idx}',
+                'year': 2000,
+                'genre': [genres[0]['slug']],
+                'category': categories[0]['slug'],
+            }
+            for idx in range(3)
+        ] + [{
+            'id': titles[0]['id'],
+            'name': 'Космос',
+            'year': 2000,
+            'genre': [genres[0]['slug']],
+            'category': categories[0]['slug'],
+        }], format='json')
+        assert response.status_code == HTTPStatus.CREATED
+        assert count_queries(client, f'{self.url}?q=ко') == 0, (
+            f'Проверьте, что после пакетной загрузки индекс `{self.url}` '
+            'обновляется без перестройки из базы данных.'
+        )
+        data = client.get(f'{self.url}?q=ко').json()
+        assert sorted(title['name'] for title in data['titles']) == [
+            'Комета 0', 'Комета 1', 'Комета 2', 'Космос'
+        ], (
+            f'Проверьте, что индекс `{self.url}` содержит произведения, '
+            'созданные и измененные пакетной загрузкой.'
+        )
+
+    def test_04_autocomplete_missed_write(self, client, admin_client):
+        create_titles(admin_client)
+        client.get(f'{self.url}?q=ко')
+        # Запись другого процесса: индекс этого процесса ее не видел,
+        # изменилась только версия модели в общем кеше.
+        Genre.objects.bulk_create([Genre(name='Корея', slug='korea')])
+        bump_version(Genre)
+        admin_client.post('/api/v1/categories/', data={
+            'name': 'Комиксы', 'slug': 'comics'
+        })
+        data = client.get(f'{self.url}?q=ко').json()
+        assert 'korea' in [genre['slug'] for genre in data['genres']], (
+            f'Проверьте, что индекс `{self.url}`, пропустивший запись '
+            'другого процесса, перестраивается, даже если после нее в '
+            'этом процессе были свои записи.'
+        )